@@ -6,15 +6,21 @@ Extracts and ranks relevant sections based on persona and job-to-be-done
 import json
 import os
 import logging
+import argparse
 from datetime import datetime
-from typing import Dict, List, Any
-from dataclasses import dataclass
+from typing import Dict, List, Any, Optional
+from dataclasses import dataclass, field
+
+import numpy as np
 
 # Reuse existing components from Round 1A
 import sys
 sys.path.append('scripts')
-from pdf_parser import PDFParser, DocumentData
+from annotations import TextAnnotation
+from pdf_parser import PDFParser, DocumentData, ParseCache
 from heading_detector import HeadingDetector
+from keyword_matcher import KeywordGroups
+from running_text import RunningTextFilter
 
 logger = logging.getLogger(__name__)
 
@@ -34,7 +40,7 @@ class JobToBeDone:
     priority_keywords: List[str]
     expected_output_type: str
 
-@dataclass
+@dataclass(slots=True)
 class RelevantSection:
     """Represents a document section with relevance scoring."""
     document: str
@@ -43,6 +49,7 @@ class RelevantSection:
     content: str
     importance_rank: int
     relevance_score: float
+    title_note: Optional[TextAnnotation] = field(default=None, compare=False, repr=False)  # From the document's annotations
 
 class PersonaAnalyzer:
     """Analyzes persona description to extract key characteristics."""
@@ -135,6 +142,17 @@ class JobAnalyzer:
             expected_output_type="menu_plan" if any(x in job_text.lower() for x in ['menu', 'buffet', 'catering', 'meal']) else "travel_plan" if 'plan' in job_text.lower() else "literature_review"  # Detect output type
         )
 
+# Terms behind the job-specific penalties and bonuses in RelevanceScorer.score_section
+BREAKFAST_TERMS = ['breakfast', 'smoothie', 'morning', 'berry', 'oatmeal', 'parfait', 'granola', 'cereal', 'muffin']
+MEAT_TERMS = ['beef', 'chicken', 'pork', 'lamb', 'shrimp', 'fish', 'seafood', 'meat', 'turkey', 'bacon', 'ham',
+              'sausage', 'taco', 'salmon', 'tuna', 'cod', 'mango salad']
+VEGGIE_TERMS = ['vegetable', 'veggie', 'plant', 'falafel', 'hummus', 'ratatouille', 'quinoa', 'tofu', 'chickpea',
+                'lentil', 'bean', 'eggplant', 'mushroom', 'sushi rolls', 'lasagna', 'vegetable lasagna',
+                'veggie sushi']
+BUFFET_TERMS = ['salad', 'dip', 'appetizer', 'side', 'rolls', 'bread', 'rice', 'pasta', 'casserole']
+DINNER_TERMS = ['dinner', 'main', 'entrée', 'entree', 'evening']
+CATERING_TERMS = ['buffet', 'catering', 'corporate', 'large', 'batch']
+
 class RelevanceScorer:
     """Scores document sections based on persona needs and job requirements."""
     
@@ -176,6 +194,30 @@ class RelevanceScorer:
             'lunch': 0.5,
             'breakfast': 0.3  # Lower weight for breakfast items when doing dinner planning
         }
+        # Section types and their weights are fixed once the scorer is built
+        self._section_weights = list(self.section_type_weights.values())
+        self._keyword_groups: Dict[tuple, KeywordGroups] = {}
+
+    def _groups_for(self, persona: PersonaProfile, job: JobToBeDone) -> KeywordGroups:
+        """Every term list score_section looks for, compiled once per persona and job keywords."""
+        persona_keywords = tuple(keyword.lower() for keyword in persona.focus_keywords)
+        job_keywords = tuple(job.priority_keywords)
+        key = (persona_keywords, job_keywords)
+        groups = self._keyword_groups.get(key)
+        if groups is None:
+            groups = KeywordGroups({
+                'persona': persona_keywords,
+                'job': job_keywords,
+                'section_types': list(self.section_type_weights),
+                'breakfast': BREAKFAST_TERMS,
+                'meat': MEAT_TERMS,
+                'veggie': VEGGIE_TERMS,
+                'buffet': BUFFET_TERMS,
+                'dinner': DINNER_TERMS,
+                'catering': CATERING_TERMS,
+            })
+            self._keyword_groups[key] = groups
+        return groups
     
     def score_section(self, section_title: str, section_content: str, 
                      persona: PersonaProfile, job: JobToBeDone) -> float:
@@ -183,51 +225,48 @@ class RelevanceScorer:
         score = 0.0
         
         combined_text = (section_title + " " + section_content).lower()
+
+        # Every term list in one pass over the text
+        hits = self._groups_for(persona, job).find(combined_text)
         
         # Score based on persona keywords
-        persona_matches = sum(1 for keyword in persona.focus_keywords 
-                            if keyword.lower() in combined_text)
+        persona_matches = len(hits['persona'])
         score += persona_matches * 0.1
         
         # Score based on job keywords  
-        job_matches = sum(1 for keyword in job.priority_keywords
-                         if keyword in combined_text)
+        job_matches = len(hits['job'])
         score += job_matches * 0.15
         
-        # Score based on section type
-        for section_type, weight in self.section_type_weights.items():
-            if section_type in combined_text:
-                score += weight
+        # Score based on section type, in section_type_weights order
+        for index in hits['section_types']:
+            score += self._section_weights[index]
         
         # Apply job-specific penalties/bonuses
         if 'dinner' in job.task_description.lower() or 'menu' in job.task_description.lower():
             # Heavy penalty for breakfast items when planning dinner
-            if any(breakfast_term in combined_text for breakfast_term in ['breakfast', 'smoothie', 'morning', 'berry', 'oatmeal', 'parfait', 'granola', 'cereal', 'muffin']):
+            if hits['breakfast']:
                 score *= 0.01  # Reduce score by 99% - extremely strong penalty
             
             # Filter out non-vegetarian items if vegetarian menu requested
             if 'vegetarian' in job.task_description.lower():
                 # Check for meat items (penalty for vegetarian menus)
-                meat_terms = ['beef', 'chicken', 'pork', 'lamb', 'shrimp', 'fish', 'seafood', 'meat', 'turkey', 'bacon', 'ham', 'sausage', 'taco', 'salmon', 'tuna', 'cod', 'mango salad']
-                if any(meat_term in combined_text for meat_term in meat_terms):
+                if hits['meat']:
                     score *= 0.001  # Even stronger penalty for meat items in vegetarian menu
             
             # Bonus for vegetarian items when vegetarian menu requested
             if 'vegetarian' in job.task_description.lower():
-                veggie_terms = ['vegetable', 'veggie', 'plant', 'falafel', 'hummus', 'ratatouille', 'quinoa', 'tofu', 'chickpea', 'lentil', 'bean', 'eggplant', 'mushroom', 'sushi rolls', 'lasagna', 'vegetable lasagna', 'veggie sushi']
-                if any(veggie_term in combined_text for veggie_term in veggie_terms):
+                if hits['veggie']:
                     score *= 5.0  # Very strong bonus for specific vegetarian dishes
             
             # Bonus for buffet-appropriate items
-            buffet_terms = ['salad', 'dip', 'appetizer', 'side', 'rolls', 'bread', 'rice', 'pasta', 'casserole']
-            if any(buffet_term in combined_text for buffet_term in buffet_terms):
+            if hits['buffet']:
                 score *= 1.8  # Bonus for buffet-style items
                 
             # Bonus for dinner-related items
-            if any(dinner_term in combined_text for dinner_term in ['dinner', 'main', 'entrée', 'entree', 'evening']):
+            if hits['dinner']:
                 score *= 2.0  # Strong bonus for dinner items
             # Bonus for buffet/catering terms
-            if any(catering_term in combined_text for catering_term in ['buffet', 'catering', 'corporate', 'large', 'batch']):
+            if hits['catering']:
                 score *= 1.5  # Increased bonus for catering terms
         
         # Boost score for longer, more substantial content
@@ -239,8 +278,12 @@ class RelevanceScorer:
 class PersonaDrivenAnalyzer:
     """Main class for persona-driven document intelligence."""
     
-    def __init__(self):
-        self.pdf_parser = PDFParser()
+    def __init__(self, parse_cache: Optional[ParseCache] = None, use_mmap: bool = False,
+                 spill_bytes: Optional[int] = None, suppress_running_text: bool = False):
+        self.pdf_parser = PDFParser(cache=parse_cache, spill_bytes=spill_bytes)
+        self.use_mmap = use_mmap
+        # Drops running headers/footers before sections are detected and their content collected
+        self.running_text_filter = RunningTextFilter() if suppress_running_text else None
         self.heading_detector = HeadingDetector() 
         self.persona_analyzer = PersonaAnalyzer()
         self.job_analyzer = JobAnalyzer()
@@ -316,7 +359,7 @@ class PersonaDrivenAnalyzer:
             if sections:
                 # Skip overly generic sections and prioritize specific dish names
                 for section in sections:
-                    title_lower = section.section_title.lower()
+                    title_lower = section.title_note.lower
                     # Skip all generic sections
                     if any(generic in title_lower for generic in [
                         'introduction', 'comprehensive guide', 'ultimate guide', 
@@ -337,7 +380,7 @@ class PersonaDrivenAnalyzer:
                 added_from_doc = sum(1 for s in diversified_sections if s.document == doc)
                 if len(sections) > 1 and added_from_doc < 2:  # Allow max 2 per document
                     for section in sections[1:]:  # Skip first (already added)
-                        title_lower = section.section_title.lower()
+                        title_lower = section.title_note.lower
                         if not any(generic in title_lower for generic in [
                             'introduction', 'comprehensive guide', 'ultimate guide', 
                             'journey through', 'guide to', 'planning, and exploring', 
@@ -389,13 +432,25 @@ class PersonaDrivenAnalyzer:
         return output
     
     def _extract_relevant_sections(self, doc_path: str, doc_name: str, 
-                                 persona: PersonaProfile, job: JobToBeDone) -> List[RelevantSection]:
-        """Extract and score relevant sections from a document."""
+                                 persona: PersonaProfile, job: JobToBeDone,
+                                 pdf_bytes=None) -> List[RelevantSection]:
+        """Extract and score relevant sections from a document.
+
+        pdf_bytes, if given, is a bytes-like object holding the PDF, and
+        doc_path is then only used as the document's name.
+        """
         
         # Parse document using existing infrastructure
-        doc_data = self.pdf_parser.parse_pdf(doc_path)
+        if pdf_bytes is not None:
+            doc_data = self.pdf_parser.parse_bytes(pdf_bytes, doc_path)
+        elif self.use_mmap:
+            doc_data = self.pdf_parser.parse_mmap(doc_path)
+        else:
+            doc_data = self.pdf_parser.parse_pdf(doc_path)
         if not doc_data:
             return []
+        if self.running_text_filter is not None:
+            doc_data = self.running_text_filter.apply(doc_data)
         
         # Detect headings/sections
         headings = self.heading_detector.detect_headings(doc_data)
@@ -419,7 +474,8 @@ class PersonaDrivenAnalyzer:
                     section_title=heading.text_block.text,
                     content=section_content,
                     importance_rank=0,  # Will be set later
-                    relevance_score=relevance_score
+                    relevance_score=relevance_score,
+                    title_note=doc_data.annotations.get(heading.text_block.text)
                 ))
         
         return sections
@@ -441,16 +497,17 @@ class PersonaDrivenAnalyzer:
             end_y = next_heading.text_block.y_position
         
         # Collect text blocks in this section
-        section_blocks = []
-        for block in doc_data.text_blocks:
-            # Skip the heading text itself
-            if block.page_num == start_page and abs(block.y_position - start_y) < 5:
-                continue
-                
-            if (block.page_num == start_page and block.y_position > start_y) or \
-               (start_page < block.page_num < end_page) or \
-               (block.page_num == end_page and block.y_position < end_y):
-                section_blocks.append(block.text)
+        table = doc_data.text_blocks
+        first, last = table.page_range_bounds(start_page, max(start_page, end_page))
+        pages = table.page_num[first:last]
+        ys = table.y0[first:last]
+
+        # Skip the heading text itself
+        is_heading = (pages == start_page) & (np.abs(ys - start_y) < 5)
+        in_section = (((pages == start_page) & (ys > start_y)) |
+                      ((pages > start_page) & (pages < end_page)) |
+                      ((pages == end_page) & (ys < end_y)))
+        section_blocks = [table.text(first + i) for i in np.flatnonzero(in_section & ~is_heading).tolist()]
         
         content = " ".join(section_blocks)
         
@@ -467,8 +524,22 @@ def main():
     """Process all collections in Challenge_1b folder."""
     
     logging.basicConfig(level=logging.INFO)
-    
-    analyzer = PersonaDrivenAnalyzer()
+
+    arg_parser = argparse.ArgumentParser(description="Persona-driven analysis of Challenge_1b collections")
+    arg_parser.add_argument("--cache-dir", default=None,
+                            help="Enable the on-disk parse cache in this directory")
+    arg_parser.add_argument("--mmap", action="store_true",
+                            help="Read PDFs through memory maps instead of file reads")
+    arg_parser.add_argument("--spill-mb", type=int, default=None,
+                            help="Spill parsed blocks to disk past this many MB per document")
+    arg_parser.add_argument("--suppress-running-text", action="store_true",
+                            help="Drop headers and footers repeated across pages before section detection")
+    args = arg_parser.parse_args()
+
+    parse_cache = ParseCache(args.cache_dir) if args.cache_dir else None
+    spill_bytes = args.spill_mb * 1024 * 1024 if args.spill_mb is not None else None
+    analyzer = PersonaDrivenAnalyzer(parse_cache=parse_cache, use_mmap=args.mmap, spill_bytes=spill_bytes,
+                                     suppress_running_text=args.suppress_running_text)
     base_path = "Challenge_1b"
     
     # Process each collection
@@ -0,0 +1,120 @@
+"""
+Text Annotations Module
+Parse-once records of a block text's numbering, case, word count and cleaned heading form
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict
+
+# "2.1.3 ", "4. ", "12": digit runs joined by dots, optional trailing dot, then whitespace
+_DECIMAL_LABEL = re.compile(r'(\d+(?:\.\d+)*)(\.?)(\s*)')
+# "IV. ", "ii) " and "B. ", "c) ": always followed by whitespace
+_ROMAN_LABEL = re.compile(r'([IVXLCDM]+|[ivxlcdm]+)([.)])(\s+)')
+_ROMAN_NUMERAL = re.compile(r'M{0,3}(?:CM|CD|D?C{0,3})(?:XC|XL|L?X{0,3})(?:IX|IV|V?I{0,3})')
+_LETTER_LABEL = re.compile(r'([A-Za-z])([.)])(\s+)')
+
+_SPECIAL_CHARS = re.compile(r'[^\w\s\-\.\(\),:;]')
+
+def clean_heading_text(text: str) -> str:
+    """Clean and normalize heading text."""
+    # Remove extra whitespace and normalize
+    text = ' '.join(text.split())
+
+    # Remove common PDF artifacts
+    text = _SPECIAL_CHARS.sub('', text)  # Remove special chars except common punctuation
+
+    # Remove trailing punctuation except for specific cases
+    if text.endswith(('.', ':', ';', ',')):
+        text = text[:-1]
+
+    # Handle incomplete sentences (common in PDFs)
+    if text.endswith(' I'):  # "I declare that... I"
+        text = text[:-2]
+
+    return text.strip()
+
+@dataclass(frozen=True, slots=True)
+class TextAnnotation:
+    """Everything the pipeline derives from a block's text alone.
+
+    numbering is "decimal" for text starting with a digit run ("2.1",
+    "3.", "2013"), "roman" or "letter" for an "IV." / "b)" label followed
+    by whitespace, and "" otherwise. For decimal labels depth counts the
+    dotted components ("2.1.3" is 3) and spaced says whether whitespace
+    follows the label; roman and letter labels have depth 1.
+    """
+    text: str  # Stripped text
+    lower: str
+    word_count: int
+    numbering: str
+    label: str  # "2.1", "3.", "IV.", "b)"; empty when unnumbered
+    depth: int  # 0 when unnumbered
+    spaced: bool
+    rest: str  # Text after the label and its whitespace
+    cleaned: str  # clean_heading_text(text)
+
+    @property
+    def trailing_dot(self) -> bool:
+        """Whether the label ends in a dot ("3." but not "3" or "2.1")."""
+        return self.label.endswith('.')
+
+def annotate(text: str) -> TextAnnotation:
+    """Annotation of a text; surrounding whitespace is ignored."""
+    text = text.strip()
+    numbering, label, depth, spaced, rest = "", "", 0, False, text
+
+    match = _DECIMAL_LABEL.match(text)
+    if match:
+        numbering = "decimal"
+        label = match.group(1) + match.group(2)
+        depth = match.group(1).count('.') + 1
+        spaced = bool(match.group(3))
+        rest = text[match.end():]
+    else:
+        match = _ROMAN_LABEL.match(text)
+        if match and _ROMAN_NUMERAL.fullmatch(match.group(1).upper()):
+            numbering = "roman"
+        else:
+            match = _LETTER_LABEL.match(text)
+            if match:
+                numbering = "letter"
+        if match:
+            label = match.group(1) + match.group(2)
+            depth, spaced = 1, True
+            rest = text[match.end():]
+
+    return TextAnnotation(
+        text=text,
+        lower=text.lower(),
+        word_count=len(text.split()),
+        numbering=numbering,
+        label=label,
+        depth=depth,
+        spaced=spaced,
+        rest=rest,
+        cleaned=clean_heading_text(text)
+    )
+
+class TextAnnotations:
+    """Per-document annotations, built once per distinct stripped text.
+
+    Heading detection, outline extraction and persona analysis all read
+    the same records, so repeated texts (running headers, titles) and
+    texts seen by several stages are parsed only once.
+    """
+
+    def __init__(self):
+        self._annotations: Dict[str, TextAnnotation] = {}
+
+    def get(self, text: str) -> TextAnnotation:
+        """Annotation of text, computed on first request."""
+        key = text.strip()
+        annotation = self._annotations.get(key)
+        if annotation is None:
+            annotation = annotate(key)
+            self._annotations[key] = annotation
+        return annotation
+
+    def __len__(self) -> int:
+        return len(self._annotations)
@@ -0,0 +1,594 @@
+"""
+Benchmark script for the outline extraction pipeline
+Run from the scripts directory: python benchmarks.py <benchmark> [pdf ...]
+"""
+
+import argparse
+import glob
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+import fitz
+import numpy as np
+
+from annotations import TextAnnotations, annotate
+from pdf_parser import ParseCache, PDFParser, TextBlock, TextBlockTable
+from heading_detector import HeadingDetector, HeadingCandidate
+from outline_extractor import OutlineExtractor
+from outline_rules import HeadingRule, OutlineRules
+from outline_writer import JsonFileWriter, NdjsonWriter
+from layout_index import LayoutIndex
+from keyword_matcher import KeywordMatcher
+from running_text import RunningTextFilter
+
+DEFAULT_CORPUS = "app/input/*.pdf"
+
+def _corpus(paths: List[str]) -> List[str]:
+    return paths or sorted(glob.glob(DEFAULT_CORPUS))
+
+def _traced_bytes(build: Callable[[], object]) -> int:
+    """Bytes allocated (and still held) while building an object graph."""
+    tracemalloc.start()
+    try:
+        result = build()
+        allocated = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return allocated
+
+# Pre-slotting layouts, kept here for before/after comparisons
+
+@dataclass
+class _DictTextBlock:
+    text: str
+    page_num: int
+    bbox: tuple
+    font_name: str
+    font_size: float
+    font_flags: int
+    line_height: float
+
+@dataclass
+class _DictHeadingCandidate:
+    text_block: object
+    confidence: float
+    level: str
+    features: Dict[str, float]
+
+def bench_block_memory(paths: List[str]) -> None:
+    """Bytes per block and per heading candidate, dict-backed vs slotted records."""
+    parser = PDFParser()
+    detector = HeadingDetector()
+
+    print(f"{'File':<24} {'Blocks':>7} {'Dict B/blk':>11} {'Slot B/blk':>11} {'Table B/blk':>12} "
+          f"{'Cands':>6} {'Dict B/cand':>12} {'Slot B/cand':>12}")
+    for path in _corpus(paths):
+        doc_data = parser.parse_pdf(path)
+        if not doc_data:
+            continue
+        table = doc_data.text_blocks
+        n = len(table)
+        texts = table.texts()  # Shared by both layouts; excluded from the totals
+        columns = list(zip(texts, table.page_num.tolist(), table.bbox.tolist(),
+                           [table.fonts[i] for i in table.font_ids.tolist()],
+                           table.font_size.tolist(), table.font_flags.tolist(),
+                           table.line_height.tolist()))
+
+        # PyMuPDF hands back a fresh font name string for every span
+        dict_bytes = _traced_bytes(lambda: [
+            _DictTextBlock(text, page, tuple(bbox), "".join(list(font)), size, flags, height)
+            for text, page, bbox, font, size, flags, height in columns
+        ])
+        slot_bytes = _traced_bytes(lambda: [
+            type(table[0])(text, page, bbox, font, size, flags, height)
+            for text, page, bbox, font, size, flags, height in columns
+        ])
+
+        candidates = detector.detect_headings(doc_data)
+        dict_cand_bytes = _traced_bytes(lambda: [
+            _DictHeadingCandidate(c.text_block, c.confidence, c.level, c.features) for c in candidates
+        ])
+        slot_cand_bytes = _traced_bytes(lambda: [
+            HeadingCandidate(c.text_block, c.confidence, c.level, c.feature_vector[:]) for c in candidates
+        ])
+        m = max(len(candidates), 1)
+
+        print(f"{os.path.basename(path):<24} {n:>7} {dict_bytes / n:>11.1f} {slot_bytes / n:>11.1f} "
+              f"{table.nbytes / n:>12.1f} {len(candidates):>6} {dict_cand_bytes / m:>12.1f} "
+              f"{slot_cand_bytes / m:>12.1f}")
+
+def _best_time(run: Callable[[], object], repeat: int = 5) -> float:
+    """Best wall time of several runs, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+class _FirstPageTitleParser(PDFParser):
+    """Ignores metadata titles so the first-page title path always runs."""
+
+    def _metadata_title(self, doc: fitz.Document) -> str:
+        return ""
+
+def bench_page_zero(paths: List[str]) -> None:
+    """Title + block extraction: page 0 read twice (legacy) vs once."""
+    parser = _FirstPageTitleParser()
+
+    def extract(path: str, single_pass: bool) -> None:
+        with fitz.open(path) as doc:
+            if not single_pass:
+                parser._largest_span_text(doc[0].get_text("dict"))
+            for page_num in range(min(doc.page_count, parser.max_pages)):
+                text_dict = parser._get_page_dict(doc[page_num])
+                if single_pass and page_num == 0:
+                    parser._largest_span_text(text_dict)
+                parser._extract_page_blocks(doc[page_num], page_num + 1, text_dict)
+
+    print(f"{'File':<24} {'Pages':>5} {'Legacy ms':>10} {'Single ms':>10} {'Saved':>7}")
+    for path in _corpus(paths):
+        with fitz.open(path) as doc:
+            pages = doc.page_count
+        legacy = _best_time(lambda: extract(path, single_pass=False))
+        single = _best_time(lambda: extract(path, single_pass=True))
+        print(f"{os.path.basename(path):<24} {pages:>5} {legacy * 1000:>10.2f} {single * 1000:>10.2f} "
+              f"{(1 - single / legacy) * 100:>6.1f}%")
+
+def bench_extraction_profile(paths: List[str]) -> None:
+    """Block output and wall time of the 'full' vs 'text' extraction profiles."""
+    full = PDFParser(extraction_profile="full")
+    text = PDFParser(extraction_profile="text")
+
+    print(f"{'File':<40} {'Blocks':>7} {'Same':>5} {'Full ms':>9} {'Text ms':>9} {'Saved':>7}")
+    totals = [0.0, 0.0]
+    for path in _corpus(paths):
+        full_doc = full.parse_pdf(path)
+        text_doc = text.parse_pdf(path)
+        same = full_doc == text_doc
+        full_time = _best_time(lambda: full.parse_pdf(path), repeat=3)
+        text_time = _best_time(lambda: text.parse_pdf(path), repeat=3)
+        totals[0] += full_time
+        totals[1] += text_time
+        blocks = len(full_doc.text_blocks) if full_doc else 0
+        print(f"{os.path.basename(path)[:40]:<40} {blocks:>7} {'yes' if same else 'NO':>5} "
+              f"{full_time * 1000:>9.1f} {text_time * 1000:>9.1f} {(1 - text_time / full_time) * 100:>6.1f}%")
+    print(f"{'Total':<40} {'':>7} {'':>5} {totals[0] * 1000:>9.1f} {totals[1] * 1000:>9.1f} "
+          f"{(1 - totals[1] / totals[0]) * 100:>6.1f}%")
+
+def bench_span_merge(paths: List[str]) -> None:
+    """Block counts and parse + heading detection time without and with line-level span merging."""
+    parsers = (PDFParser(), PDFParser(merge_spans=True))
+    detector = HeadingDetector()
+
+    def run(parser: PDFParser, path: str) -> None:
+        doc_data = parser.parse_pdf(path)
+        if doc_data:
+            detector.detect_headings(doc_data)
+
+    print(f"{'File':<24} {'Spans':>7} {'Merged':>7} {'Fewer':>7} {'Span ms':>9} {'Merged ms':>10} {'Saved':>7}")
+    totals = [0, 0, 0.0, 0.0]
+    for path in _corpus(paths):
+        docs = [parser.parse_pdf(path) for parser in parsers]
+        counts = [len(doc.text_blocks) if doc else 0 for doc in docs]
+        times = [_best_time(lambda: run(parser, path), repeat=3) for parser in parsers]
+        for i, value in enumerate(counts + times):
+            totals[i] += value
+        print(f"{os.path.basename(path)[:24]:<24} {counts[0]:>7} {counts[1]:>7} "
+              f"{(1 - counts[1] / max(counts[0], 1)) * 100:>6.1f}% {times[0] * 1000:>9.1f} "
+              f"{times[1] * 1000:>10.1f} {(1 - times[1] / times[0]) * 100:>6.1f}%")
+    print(f"{'Total':<24} {totals[0]:>7} {totals[1]:>7} {(1 - totals[1] / max(totals[0], 1)) * 100:>6.1f}% "
+          f"{totals[2] * 1000:>9.1f} {totals[3] * 1000:>10.1f} {(1 - totals[3] / totals[2]) * 100:>6.1f}%")
+
+def bench_bookmarks(paths: List[str]) -> None:
+    """Outline time from embedded bookmarks vs parse + heading detection."""
+    parser = PDFParser()
+    detector = HeadingDetector()
+    extractor = OutlineExtractor()
+
+    def heuristic(path: str) -> None:
+        doc_data = parser.parse_pdf(path)
+        if doc_data:
+            extractor.create_outline(doc_data, detector.detect_headings(doc_data))
+
+    def bookmarks(path: str) -> None:
+        outline = parser.read_bookmarks(path)
+        if outline:
+            extractor.create_outline_from_bookmarks(outline)
+
+    print(f"{'File':<40} {'Marks':>6} {'Detect ms':>10} {'Marks ms':>9} {'Speedup':>8}")
+    for path in _corpus(paths):
+        outline = parser.read_bookmarks(path)
+        detect_time = _best_time(lambda: heuristic(path), repeat=3)
+        if outline is None:
+            print(f"{os.path.basename(path)[:40]:<40} {'-':>6} {detect_time * 1000:>10.1f} {'-':>9} {'-':>8}")
+            continue
+        marks_time = _best_time(lambda: bookmarks(path), repeat=3)
+        print(f"{os.path.basename(path)[:40]:<40} {len(outline.entries):>6} {detect_time * 1000:>10.1f} "
+              f"{marks_time * 1000:>9.2f} {detect_time / marks_time:>7.0f}x")
+
+def bench_title(paths: List[str]) -> None:
+    """Title-only read vs a full parse, against the bare file open time."""
+    parser = PDFParser()
+
+    def open_only(path: str) -> None:
+        with fitz.open(path) as doc:
+            doc.page_count
+
+    print(f"{'File':<40} {'Open ms':>8} {'Title ms':>9} {'Parse ms':>9} {'Speedup':>8}")
+    for path in _corpus(paths):
+        open_time = _best_time(lambda: open_only(path), repeat=5)
+        title_time = _best_time(lambda: parser.read_title(path), repeat=5)
+        parse_time = _best_time(lambda: parser.parse_pdf(path), repeat=3)
+        print(f"{os.path.basename(path)[:40]:<40} {open_time * 1000:>8.2f} {title_time * 1000:>9.2f} "
+              f"{parse_time * 1000:>9.1f} {parse_time / title_time:>7.0f}x")
+
+def _synthetic_table(pages: int, blocks_per_page: int, seed: int = 0) -> TextBlockTable:
+    """Dense pages of randomly placed blocks; y positions are snapped to a grid so rows tie."""
+    rng = np.random.default_rng(seed)
+    blocks = []
+    for page_num in range(1, pages + 1):
+        xs = rng.uniform(0, 550, blocks_per_page)
+        ys = np.round(rng.uniform(0, 780, blocks_per_page) / 2) * 2
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            blocks.append(TextBlock(text="text", page_num=page_num, bbox=(x, y, x + 40, y + 10),
+                                    font_name="Body", font_size=10.0, font_flags=0, line_height=10.0))
+    return TextBlockTable.from_blocks(blocks)
+
+def _scan_nearest_above(table: TextBlockTable, index: int, max_dx: float):
+    """Reference query: vectorized scan of the whole page, as before the layout index."""
+    start, end = table.page_bounds(int(table.page_num[index]))
+    x0, y0 = table.x0[start:end], table.y0[start:end]
+    above = (y0 < table.y0[index]) & (np.abs(x0 - table.x0[index]) < max_dx)
+    if not above.any():
+        return None
+    above_indices = np.flatnonzero(above)
+    return start + int(above_indices[np.argmin(table.y0[index] - y0[above_indices])])
+
+def bench_top_spacing(paths: List[str]) -> None:
+    """Nearest-block-above queries: page scan vs LayoutIndex, on large synthetic pages."""
+    print(f"{'Blocks/page':>11} {'Queries':>8} {'Scan ms':>9} {'Index ms':>9} {'Speedup':>8} {'Identical':>10}")
+    for blocks_per_page in (200, 1000, 5000):
+        table = _synthetic_table(pages=4, blocks_per_page=blocks_per_page)
+        queries = range(0, len(table), max(1, len(table) // 2000))
+        xs, ys, pages = table.x0.tolist(), table.y0.tolist(), table.page_num.tolist()
+
+        def scan():
+            return [_scan_nearest_above(table, i, 50) for i in queries]
+
+        def indexed():
+            layout = LayoutIndex(table)
+            return [layout.nearest_above(pages[i], xs[i], ys[i], 50) for i in queries]
+
+        identical = scan() == indexed()
+        scan_time = _best_time(scan, repeat=3)
+        index_time = _best_time(indexed, repeat=3)
+        print(f"{blocks_per_page:>11} {len(queries):>8} {scan_time * 1000:>9.1f} {index_time * 1000:>9.1f} "
+              f"{scan_time / index_time:>7.1f}x {str(identical):>10}")
+
+def bench_batch_scoring(paths: List[str]) -> None:
+    """Heading candidate scoring throughput: one block at a time vs one batch per document."""
+    parser = PDFParser(max_pages=None)
+    detector = HeadingDetector()
+
+    print(f"{'File':<24} {'Blocks':>7} {'Cands':>6} {'Single/s':>10} {'Batch/s':>10} {'Speedup':>8} "
+          f"{'Detect blocks/s':>16}")
+    for path in _corpus(paths):
+        doc_data = parser.parse_pdf(path)
+        if not doc_data:
+            continue
+        stats = detector._calculate_document_stats(doc_data)
+        rows = [i for i, block in enumerate(doc_data.text_blocks) if detector._is_potential_heading(block, stats)]
+        blocks = [doc_data.text_blocks[i] for i in rows]
+        if not blocks:
+            continue
+
+        single_time = _best_time(lambda: [detector._analyze_heading_candidate(block, doc_data, stats)
+                                          for block in blocks], repeat=3)
+        batch_time = _best_time(lambda: detector._score_candidates(doc_data, stats, blocks, rows), repeat=3)
+        detect_time = _best_time(lambda: detector.detect_headings(doc_data), repeat=3)
+        print(f"{os.path.basename(path)[:24]:<24} {len(doc_data.text_blocks):>7} {len(blocks):>6} "
+              f"{len(blocks) / single_time:>10.0f} {len(blocks) / batch_time:>10.0f} "
+              f"{single_time / batch_time:>7.1f}x {len(doc_data.text_blocks) / detect_time:>16.0f}")
+
+def bench_keywords(paths: List[str]) -> None:
+    """Keyword scan cost vs dictionary size: `k in text` per keyword vs one KeywordMatcher pass."""
+    parser = PDFParser()
+    texts = []
+    for path in _corpus(paths):
+        doc_data = parser.parse_pdf(path)
+        if doc_data:
+            texts.extend(block.text.lower() for block in doc_data.text_blocks)
+    if not texts:
+        return
+
+    # Vocabulary: the corpus words plus deterministic synthetic terms that never occur
+    words = sorted({word for text in texts for word in text.split() if len(word) > 3})
+    synthetic = [f"term{i:05d}x" for i in range(5000)]
+    chars = sum(len(text) for text in texts)
+
+    print(f"{len(texts)} texts, {chars} characters")
+    print(f"{'Keywords':>8} {'Loop ms':>9} {'Matcher ms':>11} {'Speedup':>8} {'Identical':>10}")
+    for size in (10, 50, 200, 1000, 5000):
+        keywords = (words[:size // 2] + synthetic)[:size]
+        matcher = KeywordMatcher(keywords)
+
+        def loop():
+            return [sum(1 for keyword in keywords if keyword in text) for text in texts]
+
+        def automaton():
+            return [matcher.count(text) for text in texts]
+
+        identical = loop() == automaton()
+        loop_time = _best_time(loop, repeat=3)
+        matcher_time = _best_time(automaton, repeat=3)
+        print(f"{size:>8} {loop_time * 1000:>9.1f} {matcher_time * 1000:>11.1f} {loop_time / matcher_time:>7.1f}x "
+              f"{str(identical):>10}")
+
+def _repetitive_pdf(pages: int) -> bytes:
+    """Document whose pages repeat bold running headers, titles and footers around unique content."""
+    doc = fitz.open()
+    for page_num in range(1, pages + 1):
+        page = doc.new_page()
+        page.insert_text((50, 30), "ACME Corporation Quarterly Report - Confidential", fontname="hebo", fontsize=9)
+        page.insert_text((50, 60), "Market Overview and Regional Performance", fontname="hebo", fontsize=14)
+        page.insert_text((50, 90), f"Section {page_num} Regional Results", fontname="hebo", fontsize=12)
+        for line in range(20):
+            page.insert_text((50, 120 + line * 14), f"Body text line {line} of page {page_num} describing results.",
+                             fontname="helv", fontsize=10)
+        page.insert_text((50, 420), "Key Figures", fontname="hebo", fontsize=11)
+        page.insert_text((50, 780), "Copyright 2024 ACME Corporation. All Rights Reserved.", fontname="hebo",
+                         fontsize=8)
+        page.insert_text((500, 780), "Page", fontname="hebo", fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+class _NoMemo(dict):
+    """Memo that never stores, to time text features computed for every occurrence."""
+
+    def __setitem__(self, key, value) -> None:
+        pass
+
+def bench_text_memo(paths: List[str]) -> None:
+    """Candidate scoring on documents with repeated running text, with and without the per-text memo."""
+    parser = PDFParser(max_pages=None)
+    detector = HeadingDetector()
+    documents = [(f"synthetic ({pages} pages)", parser.parse_bytes(_repetitive_pdf(pages), "synthetic.pdf"))
+                 for pages in (100, 300)]
+    documents += [(os.path.basename(path), parser.parse_pdf(path)) for path in _corpus(paths)]
+
+    print(f"{'Document':<24} {'Cands':>6} {'Distinct':>9} {'Uncached ms':>12} {'Memo ms':>9} {'Saved':>7}")
+    for name, doc_data in documents:
+        if not doc_data:
+            continue
+
+        def score(memo: dict):
+            stats = detector._calculate_document_stats(doc_data)
+            stats['text_features'] = memo
+            return detector._score_blocks(doc_data, stats)[0]
+
+        candidates = score({})
+        distinct = len({candidate.text_block.text.strip() for candidate in candidates})
+        uncached_time = _best_time(lambda: score(_NoMemo()), repeat=3)
+        memo_time = _best_time(lambda: score({}), repeat=3)
+        print(f"{name[:24]:<24} {len(candidates):>6} {distinct:>9} {uncached_time * 1000:>12.1f} "
+              f"{memo_time * 1000:>9.1f} {(1 - memo_time / uncached_time) * 100:>6.1f}%")
+
+def bench_running_text(paths: List[str]) -> None:
+    """Blocks, heading candidates and detection time without and with running header/footer suppression."""
+    parser = PDFParser(max_pages=None)
+    detector = HeadingDetector()
+    running_filter = RunningTextFilter()
+    documents = [(f"synthetic ({pages} pages)", parser.parse_bytes(_repetitive_pdf(pages), "synthetic.pdf"))
+                 for pages in (100, 300)]
+    documents += [(os.path.basename(path), parser.parse_pdf(path)) for path in _corpus(paths)]
+
+    print(f"{'Document':<24} {'Blocks':>7} {'Removed':>8} {'Cands':>6} {'Filtered':>9} {'Detect ms':>10} "
+          f"{'Pre-pass + detect ms':>21}")
+    for name, doc_data in documents:
+        if not doc_data:
+            continue
+        filtered = running_filter.apply(doc_data)
+        before, after = detector.detect_headings(doc_data), detector.detect_headings(filtered)
+        detect_time = _best_time(lambda: detector.detect_headings(doc_data), repeat=3)
+        filtered_time = _best_time(lambda: detector.detect_headings(running_filter.apply(doc_data)), repeat=3)
+        print(f"{name[:24]:<24} {len(doc_data.text_blocks):>7} "
+              f"{len(doc_data.text_blocks) - len(filtered.text_blocks):>8} {len(before):>6} {len(after):>9} "
+              f"{detect_time * 1000:>10.1f} {filtered_time * 1000:>21.1f}")
+
+class _NoAnnotationMemo(TextAnnotations):
+    """Annotations rebuilt on every request, as when each stage re-parsed the text itself."""
+
+    def get(self, text: str):
+        return annotate(text)
+
+def bench_annotations(paths: List[str]) -> None:
+    """Heading detection plus outline extraction with shared text annotations and with per-request ones."""
+    parser = PDFParser(max_pages=None)
+    detector = HeadingDetector()
+    extractor = OutlineExtractor()
+    documents = [(f"synthetic ({pages} pages)", parser.parse_bytes(_repetitive_pdf(pages), "synthetic.pdf"))
+                 for pages in (100, 300)]
+    documents += [(os.path.basename(path), parser.parse_pdf(path)) for path in _corpus(paths)]
+
+    print(f"{'Document':<24} {'Blocks':>7} {'Annotated':>10} {'Per-request ms':>15} {'Shared ms':>10} {'Saved':>7}")
+    for name, doc_data in documents:
+        if not doc_data:
+            continue
+
+        def run(annotations: TextAnnotations) -> TextAnnotations:
+            doc_data.annotations = annotations
+            extractor._process_default(doc_data, detector.detect_headings(doc_data))
+            return annotations
+
+        annotated = len(run(TextAnnotations()))
+        per_request_time = _best_time(lambda: run(_NoAnnotationMemo()), repeat=3)
+        shared_time = _best_time(lambda: run(TextAnnotations()), repeat=3)
+        print(f"{name[:24]:<24} {len(doc_data.text_blocks):>7} {annotated:>10} {per_request_time * 1000:>15.1f} "
+              f"{shared_time * 1000:>10.1f} {(1 - shared_time / per_request_time) * 100:>6.1f}%")
+
+def _revise_one_page(data: bytes) -> bytes:
+    """The document with a line of text added to its middle page."""
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        page = doc[doc.page_count // 2]
+        page.insert_text((50, page.rect.height - 20), "Revised", fontname="helv", fontsize=8)
+        return doc.tobytes()
+
+def bench_incremental(paths: List[str]) -> None:
+    """Parse + heading detection of a document revised on one page: full reprocessing vs per-page cache entries."""
+
+    def run(data: bytes, cache=None) -> None:
+        parser = PDFParser(cache=cache, max_pages=None, incremental=cache is not None)
+        doc_data = parser.parse_bytes(data, "document.pdf")
+        if doc_data:
+            HeadingDetector(cache=cache).detect_headings(doc_data)
+
+    def cached_run(data: bytes, warm_with: bytes = None, repeat: int = 3) -> float:
+        """Best time of an incremental run on a fresh cache, optionally filled from another revision first."""
+        best = float('inf')
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory(prefix="incremental_cache_") as directory:
+                cache = ParseCache(directory)
+                if warm_with is not None:
+                    run(warm_with, cache)
+                start = time.perf_counter()
+                run(data, cache)
+                best = min(best, time.perf_counter() - start)
+        return best
+
+    documents = [("synthetic (300 pages)", _repetitive_pdf(300))]
+    for path in _corpus(paths):
+        with open(path, 'rb') as f:
+            documents.append((os.path.basename(path), f.read()))
+
+    print(f"{'Document':<24} {'Pages':>6} {'Full ms':>9} {'First run ms':>13} {'Revised ms':>11} {'Speedup':>8}")
+    for name, original in documents:
+        revised = _revise_one_page(original)
+        with fitz.open(stream=original, filetype="pdf") as doc:
+            pages = doc.page_count
+        full_time = _best_time(lambda: run(revised), repeat=3)
+        first_time = cached_run(revised)
+        revised_time = cached_run(revised, warm_with=original)
+        print(f"{name[:24]:<24} {pages:>6} {full_time * 1000:>9.1f} {first_time * 1000:>13.1f} "
+              f"{revised_time * 1000:>11.1f} {full_time / revised_time:>7.1f}x")
+
+class _SequentialRules(OutlineRules):
+    """Heading rules tried one compiled regex at a time, in order, like the former per-item pattern loop."""
+
+    def __init__(self, documents, headings):
+        super().__init__(documents, headings)
+        self._patterns = [(re.compile(rule.pattern), rule) for rule in self.headings]
+
+    def match_heading(self, text_key: str):
+        for pattern, rule in self._patterns:
+            if pattern.match(text_key):
+                return rule
+        return None
+
+def _synthetic_heading_rules(count: int) -> List[HeadingRule]:
+    """The packaged heading rules plus numbered and literal rules up to count."""
+    rules = list(OutlineRules.default().headings)
+    section = 0
+    while len(rules) < count:
+        section += 1
+        rules.append(HeadingRule(rf'^{section}\.\d+\s+topic {section}', 'H3'))
+        rules.append(HeadingRule(rf'^appendix {section}$', 'H2'))
+    return rules[:count]
+
+def bench_outline_rules(paths: List[str]) -> None:
+    """Heading de-duplication time per item as the heading rule set grows, compiled vs one regex per rule."""
+    rnd = np.random.default_rng(0)
+    items = []
+    for i in range(2000):
+        section = int(rnd.integers(1, 300))
+        text = rnd.choice([f"{section}.{i % 9} Topic {section} part {i}", f"Appendix {section}",
+                           f"Body heading number {i}", "2.1 Intended Audience", f"1. Introduction {i}"])
+        items.append({"level": "H1", "text": str(text), "page": i // 50})
+
+    print(f"{'Rules':>6} {'Matched':>8} {'Sequential us/item':>19} {'Compiled us/item':>17}")
+    for count in (17, 100, 300, 600):
+        headings = _synthetic_heading_rules(count)
+        sequential = OutlineExtractor(_SequentialRules([], headings))
+        compiled = OutlineExtractor(OutlineRules([], headings))
+        matched = len(compiled._remove_duplicates_and_sort(items))
+        sequential_time = _best_time(lambda: sequential._remove_duplicates_and_sort(items), repeat=3)
+        compiled_time = _best_time(lambda: compiled._remove_duplicates_and_sort(items), repeat=3)
+        print(f"{count:>6} {matched:>8} {sequential_time / len(items) * 1e6:>19.2f} "
+              f"{compiled_time / len(items) * 1e6:>17.2f}")
+
+def bench_output_format(paths: List[str]) -> None:
+    """Writing a batch of outlines as one JSON file per PDF vs one NDJSON stream."""
+    parser = PDFParser()
+    extractor = OutlineExtractor()
+    detector = HeadingDetector()
+    outlines = []
+    for path in _corpus(paths):
+        doc_data = parser.parse_pdf(path)
+        if doc_data:
+            doc_data.file_path = os.path.basename(path) + ".copy"  # Skip the fixed per-document outlines
+            outlines.append((path, extractor.create_outline(doc_data, detector.detect_headings(doc_data))))
+
+    print(f"{'Documents':>10} {'JSON files ms':>14} {'NDJSON ms':>10} {'JSON bytes':>11} {'NDJSON bytes':>13}")
+    for count in (100, 1000, 5000):
+        batch = [(f"{path}#{i}", outline) for i in range(count // len(outlines) + 1) for path, outline in outlines][:count]
+        directory = tempfile.mkdtemp(prefix="outline_output_")
+        try:
+            def write_files():
+                with JsonFileWriter() as writer:
+                    for i, (name, outline) in enumerate(batch):
+                        writer.write(name, outline, os.path.join(directory, "json", f"{i}.json"), {"total": 0.0})
+
+            def write_ndjson():
+                with NdjsonWriter.open(os.path.join(directory, "outlines.ndjson")) as writer:
+                    for i, (name, outline) in enumerate(batch):
+                        writer.write(name, outline, "", {"total": 0.0})
+
+            files_time = _best_time(write_files, repeat=3)
+            ndjson_time = _best_time(write_ndjson, repeat=3)
+            json_bytes = sum(entry.stat().st_size for entry in os.scandir(os.path.join(directory, "json")))
+            ndjson_bytes = os.path.getsize(os.path.join(directory, "outlines.ndjson"))
+        finally:
+            shutil.rmtree(directory)
+        print(f"{count:>10} {files_time * 1000:>14.1f} {ndjson_time * 1000:>10.1f} "
+              f"{json_bytes:>11} {ndjson_bytes:>13}")
+
+BENCHMARKS = {
+    "block-memory": bench_block_memory,
+    "page-zero": bench_page_zero,
+    "extraction-profile": bench_extraction_profile,
+    "span-merge": bench_span_merge,
+    "bookmarks": bench_bookmarks,
+    "title": bench_title,
+    "top-spacing": bench_top_spacing,
+    "batch-scoring": bench_batch_scoring,
+    "keywords": bench_keywords,
+    "incremental": bench_incremental,
+    "text-memo": bench_text_memo,
+    "running-text": bench_running_text,
+    "annotations": bench_annotations,
+    "outline-rules": bench_outline_rules,
+    "output-format": bench_output_format,
+}
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Pipeline benchmarks")
+    arg_parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    arg_parser.add_argument("paths", nargs="*", help=f"PDF files (default: {DEFAULT_CORPUS})")
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    start = time.perf_counter()
+    BENCHMARKS[args.benchmark](args.paths)
+    print(f"\nCompleted in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
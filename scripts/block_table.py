@@ -0,0 +1,530 @@
+"""
+Text Block Storage Module
+Defines the TextBlock record, a columnar, array-backed table of blocks, and a
+disk-spilling variant for documents too large to hold in memory
+"""
+
+import mmap
+import os
+import sys
+import tempfile
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from font_stats import FontStatistics
+
+@dataclass(slots=True, init=False)
+class TextBlock:
+    """Represents a text block with formatting and position information.
+
+    Slotted, with the bbox unpacked into four float fields and the font name
+    interned, so many blocks sharing a font share one string.
+    """
+    text: str
+    page_num: int
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    font_name: str
+    font_size: float
+    font_flags: int  # Bold, italic, etc.
+    line_height: float
+
+    def __init__(self, text: str, page_num: int, bbox: tuple, font_name: str,
+                 font_size: float, font_flags: int, line_height: float):
+        self.text = text
+        self.page_num = page_num
+        self.x0, self.y0, self.x1, self.y1 = bbox
+        self.font_name = sys.intern(font_name)
+        self.font_size = font_size
+        self.font_flags = font_flags
+        self.line_height = line_height
+
+    @property
+    def bbox(self) -> tuple:
+        """Bounding box as (x0, y0, x1, y1)."""
+        return (self.x0, self.y0, self.x1, self.y1)
+
+    @property
+    def is_bold(self) -> bool:
+        """Check if text is bold."""
+        return bool(self.font_flags & 2**4)
+
+    @property
+    def is_italic(self) -> bool:
+        """Check if text is italic."""
+        return bool(self.font_flags & 2**1)
+
+    @property
+    def x_position(self) -> float:
+        """Get x position (left edge)."""
+        return self.x0
+
+    @property
+    def y_position(self) -> float:
+        """Get y position (top edge)."""
+        return self.y0
+
+    @property
+    def width(self) -> float:
+        """Get text width."""
+        return self.x1 - self.x0
+
+    @property
+    def height(self) -> float:
+        """Get text height."""
+        return self.y1 - self.y0
+
+class TextBlockTable:
+    """Columnar store of text blocks.
+
+    Numeric attributes live in NumPy arrays (one entry per block), font names
+    are interned into a small font table referenced by id, and all block text
+    shares a single string buffer addressed by offsets. Blocks are kept in
+    document order, so page numbers are non-decreasing.
+
+    The table behaves like a read-only sequence of TextBlock objects, built on
+    access, so existing callers can keep iterating over it.
+    """
+
+    def __init__(self, page_num: np.ndarray, bbox: np.ndarray, font_size: np.ndarray,
+                 font_flags: np.ndarray, line_height: np.ndarray, font_ids: np.ndarray,
+                 fonts: List[str], text_buffer: str, text_offsets: np.ndarray):
+        self.page_num = page_num          # int32, shape (n,)
+        self.bbox = bbox                  # float64, shape (n, 4)
+        self.font_size = font_size        # float64, shape (n,)
+        self.font_flags = font_flags      # int32, shape (n,)
+        self.line_height = line_height    # float64, shape (n,)
+        self.font_ids = font_ids          # int32 indexes into fonts, shape (n,)
+        self.fonts = [sys.intern(font) for font in fonts]
+        self.text_buffer = text_buffer
+        self.text_offsets = text_offsets  # int64, shape (n + 1,)
+
+    @classmethod
+    def from_blocks(cls, blocks: Iterable[TextBlock]) -> 'TextBlockTable':
+        """Build a table from TextBlock records."""
+        blocks = list(blocks)
+        font_index: Dict[str, int] = {}
+        font_ids = []
+        for block in blocks:
+            font_id = font_index.get(block.font_name)
+            if font_id is None:
+                font_id = font_index[block.font_name] = len(font_index)
+            font_ids.append(font_id)
+
+        texts = [block.text for block in blocks]
+        text_offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        if texts:
+            np.cumsum([len(text) for text in texts], out=text_offsets[1:])
+
+        return cls(
+            page_num=np.array([block.page_num for block in blocks], dtype=np.int32),
+            bbox=np.array([block.bbox for block in blocks], dtype=np.float64).reshape(-1, 4),
+            font_size=np.array([block.font_size for block in blocks], dtype=np.float64),
+            font_flags=np.array([block.font_flags for block in blocks], dtype=np.int32),
+            line_height=np.array([block.line_height for block in blocks], dtype=np.float64),
+            font_ids=np.array(font_ids, dtype=np.int32),
+            fonts=list(font_index),
+            text_buffer="".join(texts),
+            text_offsets=text_offsets,
+        )
+
+    @classmethod
+    def empty(cls) -> 'TextBlockTable':
+        return cls.from_blocks([])
+
+    @classmethod
+    def concat(cls, tables: Iterable['TextBlockTable']) -> 'TextBlockTable':
+        """Join tables end to end, merging their font tables."""
+        tables = list(tables)
+        if not tables:
+            return cls.empty()
+
+        font_index: Dict[str, int] = {}
+        font_ids = []
+        text_offsets = []
+        base = 0
+        for table in tables:
+            remap = np.array([font_index.setdefault(font, len(font_index)) for font in table.fonts],
+                             dtype=np.int32)
+            font_ids.append(remap[table.font_ids] if len(table) else table.font_ids)
+            text_offsets.append(table.text_offsets[:-1] + base)
+            base += len(table.text_buffer)
+        text_offsets.append(np.array([base], dtype=np.int64))
+
+        return cls(
+            page_num=np.concatenate([t.page_num for t in tables]),
+            bbox=np.concatenate([t.bbox for t in tables]),
+            font_size=np.concatenate([t.font_size for t in tables]),
+            font_flags=np.concatenate([t.font_flags for t in tables]),
+            line_height=np.concatenate([t.line_height for t in tables]),
+            font_ids=np.concatenate(font_ids),
+            fonts=list(font_index),
+            text_buffer="".join(t.text_buffer for t in tables),
+            text_offsets=np.concatenate(text_offsets),
+        )
+
+    # Column accessors
+
+    @property
+    def x0(self) -> np.ndarray:
+        return self.bbox[:, 0]
+
+    @property
+    def y0(self) -> np.ndarray:
+        return self.bbox[:, 1]
+
+    @property
+    def x1(self) -> np.ndarray:
+        return self.bbox[:, 2]
+
+    @property
+    def y1(self) -> np.ndarray:
+        return self.bbox[:, 3]
+
+    @property
+    def is_bold(self) -> np.ndarray:
+        return (self.font_flags & 2**4) != 0
+
+    def text(self, index: int) -> str:
+        """Text of a single block."""
+        return self.text_buffer[self.text_offsets[index]:self.text_offsets[index + 1]]
+
+    def texts(self) -> List[str]:
+        """Text of every block, in order."""
+        offsets = self.text_offsets.tolist()
+        buffer = self.text_buffer
+        return [buffer[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+    def font_counts(self) -> Dict[str, int]:
+        """Number of blocks per font name, in first-seen order."""
+        counts = np.bincount(self.font_ids, minlength=len(self.fonts))
+        return {font: int(count) for font, count in zip(self.fonts, counts) if count}
+
+    def page_bounds(self, page_num: int) -> Tuple[int, int]:
+        """Index range [start, end) of the blocks on a page."""
+        return self.page_range_bounds(page_num, page_num)
+
+    def page_range_bounds(self, first_page: int, last_page: int) -> Tuple[int, int]:
+        """Index range [start, end) of the blocks on pages first_page..last_page."""
+        start = int(np.searchsorted(self.page_num, first_page, side='left'))
+        end = int(np.searchsorted(self.page_num, last_page, side='right'))
+        return start, max(start, end)
+
+    def take(self, indices: Union[Sequence[int], np.ndarray]) -> 'TextBlockTable':
+        """New table holding the blocks at the given indices, in that order.
+
+        Only the selected texts are cut from the buffer, so the cost grows
+        with len(indices), not with the size of the table.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        buffer = self.text_buffer
+        starts = self.text_offsets[indices].tolist()
+        ends = self.text_offsets[indices + 1].tolist()
+        selected = [buffer[start:end] for start, end in zip(starts, ends)]
+        text_offsets = np.zeros(len(selected) + 1, dtype=np.int64)
+        if selected:
+            np.cumsum([len(text) for text in selected], out=text_offsets[1:])
+
+        return TextBlockTable(
+            page_num=self.page_num[indices],
+            bbox=self.bbox[indices],
+            font_size=self.font_size[indices],
+            font_flags=self.font_flags[indices],
+            line_height=self.line_height[indices],
+            font_ids=self.font_ids[indices],
+            fonts=self.fonts,
+            text_buffer="".join(selected),
+            text_offsets=text_offsets,
+        )
+
+    def _slice(self, start: int, end: int) -> 'TextBlockTable':
+        """Table of the blocks in [start, end): column views and one cut of the text buffer."""
+        text_start = int(self.text_offsets[start])
+        return TextBlockTable(
+            page_num=self.page_num[start:end],
+            bbox=self.bbox[start:end],
+            font_size=self.font_size[start:end],
+            font_flags=self.font_flags[start:end],
+            line_height=self.line_height[start:end],
+            font_ids=self.font_ids[start:end],
+            fonts=self.fonts,
+            text_buffer=self.text_buffer[text_start:int(self.text_offsets[end])],
+            text_offsets=self.text_offsets[start:end + 1] - text_start,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the table's columns and text buffer."""
+        arrays = (self.page_num, self.bbox, self.font_size, self.font_flags,
+                  self.line_height, self.font_ids, self.text_offsets)
+        return sum(a.nbytes for a in arrays) + len(self.text_buffer.encode('utf-8'))
+
+    # Sequence protocol (TextBlock views)
+
+    def __len__(self) -> int:
+        return len(self.page_num)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, end, step = key.indices(len(self))
+            if step == 1:
+                return self._slice(start, max(start, end))
+            return self.take(np.arange(start, end, step))
+
+        n = len(self)
+        index = int(key)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("TextBlockTable index out of range")
+
+        return TextBlock(
+            text=self.text(index),
+            page_num=int(self.page_num[index]),
+            bbox=tuple(self.bbox[index].tolist()),
+            font_name=self.fonts[self.font_ids[index]],
+            font_size=float(self.font_size[index]),
+            font_flags=int(self.font_flags[index]),
+            line_height=float(self.line_height[index])
+        )
+
+    def __iter__(self) -> Iterator[TextBlock]:
+        fonts = self.fonts
+        columns = zip(
+            self.texts(),
+            self.page_num.tolist(),
+            self.bbox.tolist(),
+            self.font_ids.tolist(),
+            self.font_size.tolist(),
+            self.font_flags.tolist(),
+            self.line_height.tolist(),
+        )
+        for text, page_num, bbox, font_id, font_size, font_flags, line_height in columns:
+            yield TextBlock(
+                text=text,
+                page_num=page_num,
+                bbox=tuple(bbox),
+                font_name=fonts[font_id],
+                font_size=font_size,
+                font_flags=font_flags,
+                line_height=line_height
+            )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TextBlockTable):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"TextBlockTable({len(self)} blocks, {len(self.fonts)} fonts)"
+
+# Column files of a spilled table: (file name, dtype, values per block)
+SPILL_COLUMNS = (
+    ('page_num', np.int32, 1),
+    ('bbox', np.float64, 4),
+    ('font_size', np.float64, 1),
+    ('font_flags', np.int32, 1),
+    ('line_height', np.float64, 1),
+    ('font_ids', np.int32, 1),
+)
+SPILL_TEXT_FILE = 'text.utf8'
+SPILL_OFFSETS_FILE = 'text_offsets'
+
+class SpilledBlockTable(TextBlockTable):
+    """TextBlockTable whose columns live in files on disk.
+
+    Numeric columns are read-only memory maps and block text is UTF-8 in a
+    single mapped file addressed by byte offsets, so the OS pages data in as
+    page ranges are read and peak RSS does not grow with document size. The
+    font table stays in memory. Whole-table operations (iteration, texts())
+    work in fixed-size chunks; prefer page_range_bounds() plus column slices
+    and text(i) for access.
+
+    The files are deleted when the table is garbage collected.
+    """
+
+    ITER_CHUNK = 4096  # Blocks materialized at a time while iterating
+
+    def __init__(self, directory: tempfile.TemporaryDirectory, fonts: List[str]):
+        self._directory = directory
+        path = directory.name
+        columns = {}
+        for name, dtype, _ in SPILL_COLUMNS:
+            file_path = os.path.join(path, name)
+            size = os.path.getsize(file_path) // np.dtype(dtype).itemsize
+            # np.memmap cannot map an empty file
+            columns[name] = np.memmap(file_path, dtype=dtype, mode='r') if size else np.zeros(0, dtype=dtype)
+        columns['bbox'] = columns['bbox'].reshape(-1, 4)
+
+        with open(os.path.join(path, SPILL_TEXT_FILE), 'rb') as f:
+            self._text_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(f.name) else b""
+
+        super().__init__(
+            fonts=fonts,
+            text_buffer="",
+            text_offsets=np.memmap(os.path.join(path, SPILL_OFFSETS_FILE), dtype=np.int64, mode='r'),
+            **columns
+        )
+
+    def text(self, index: int) -> str:
+        """Text of a single block, decoded from the mapped text file."""
+        return self._text_map[self.text_offsets[index]:self.text_offsets[index + 1]].decode('utf-8')
+
+    def texts(self) -> List[str]:
+        return [self.text(i) for i in range(len(self))]
+
+    def take(self, indices: Union[Sequence[int], np.ndarray]) -> TextBlockTable:
+        """In-memory table holding the blocks at the given indices, in that order."""
+        indices = np.asarray(indices, dtype=np.int64)
+        selected = [self.text(i) for i in indices.tolist()]
+        text_offsets = np.zeros(len(selected) + 1, dtype=np.int64)
+        if selected:
+            np.cumsum([len(text) for text in selected], out=text_offsets[1:])
+
+        return TextBlockTable(
+            page_num=np.array(self.page_num[indices]),
+            bbox=np.array(self.bbox[indices]),
+            font_size=np.array(self.font_size[indices]),
+            font_flags=np.array(self.font_flags[indices]),
+            line_height=np.array(self.line_height[indices]),
+            font_ids=np.array(self.font_ids[indices]),
+            fonts=self.fonts,
+            text_buffer="".join(selected),
+            text_offsets=text_offsets,
+        )
+
+    def take_spilled(self, indices: Union[Sequence[int], np.ndarray]) -> TextBlockTable:
+        """Spilled table holding the blocks at the given indices, in that order.
+
+        Blocks are copied ITER_CHUNK at a time into new files beside this
+        table's, so memory stays flat however many blocks are kept.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        builder = BlockTableBuilder(spill_bytes=0, spill_dir=os.path.dirname(self._directory.name))
+        for start in range(0, len(indices), self.ITER_CHUNK):
+            builder.add_table(self.take(indices[start:start + self.ITER_CHUNK]))
+        return builder.finish()
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held on disk by the table's files."""
+        path = self._directory.name
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.take(np.arange(*key.indices(len(self))))
+        return super().__getitem__(key)
+
+    def __iter__(self) -> Iterator[TextBlock]:
+        for start in range(0, len(self), self.ITER_CHUNK):
+            yield from TextBlockTable.__iter__(self[start:start + self.ITER_CHUNK])
+
+    def __repr__(self) -> str:
+        return f"SpilledBlockTable({len(self)} blocks, {len(self.fonts)} fonts, {self._directory.name})"
+
+class BlockTableBuilder:
+    """Accumulates extracted blocks, in document order, into a TextBlockTable.
+
+    Without a spill limit, or while the blocks held stay under it, the
+    result is an ordinary in-memory table. Once the approximate memory held
+    exceeds spill_bytes, pending blocks are appended to column files in a
+    temporary directory under spill_dir and finish() returns a
+    SpilledBlockTable. font_stats is filled as blocks arrive, so statistics
+    never need a second pass over the table.
+    """
+
+    BLOCK_OVERHEAD = 120  # Approximate bytes per pending TextBlock, excluding text
+
+    def __init__(self, spill_bytes: Optional[int] = None, spill_dir: Optional[str] = None):
+        self.spill_bytes = spill_bytes
+        self.spill_dir = spill_dir
+        self.font_stats = FontStatistics()
+        self._tables: List[TextBlockTable] = []
+        self._blocks: List[TextBlock] = []
+        self._pending_bytes = 0
+        self._directory: Optional[tempfile.TemporaryDirectory] = None
+        self._font_index: Dict[str, int] = {}
+        self._text_bytes = 0
+
+    def add_blocks(self, blocks: Iterable[TextBlock]) -> None:
+        """Append blocks, spilling to disk if the memory limit is exceeded."""
+        for block in blocks:
+            self._blocks.append(block)
+            self.font_stats.add(block.font_size, block.font_name)
+            self._pending_bytes += self.BLOCK_OVERHEAD + len(block.text)
+        self._check_limit()
+
+    def add_table(self, table: TextBlockTable) -> None:
+        """Append a table of blocks, e.g. one extracted by a worker process."""
+        self._flush_blocks()
+        self.font_stats.add_table(table)
+        self._tables.append(table)
+        self._pending_bytes += table.nbytes
+        self._check_limit()
+
+    def finish(self) -> TextBlockTable:
+        """The accumulated table; the builder should not be used afterwards."""
+        if self._directory is None:
+            if not self._tables:
+                return TextBlockTable.from_blocks(self._blocks)
+            self._flush_blocks()
+            return self._tables[0] if len(self._tables) == 1 else TextBlockTable.concat(self._tables)
+
+        self._spill_pending()
+        return SpilledBlockTable(self._directory, list(self._font_index))
+
+    def _flush_blocks(self) -> None:
+        if self._blocks:
+            self._tables.append(TextBlockTable.from_blocks(self._blocks))
+            self._blocks = []
+
+    def _check_limit(self) -> None:
+        if self.spill_bytes is not None and self._pending_bytes > self.spill_bytes:
+            self._spill_pending()
+
+    def _spill_pending(self) -> None:
+        self._flush_blocks()
+        for table in self._tables:
+            self._spill(table)
+        self._tables = []
+        self._pending_bytes = 0
+
+    def _spill(self, table: TextBlockTable) -> None:
+        if self._directory is None:
+            if self.spill_dir:
+                os.makedirs(self.spill_dir, exist_ok=True)
+            self._directory = tempfile.TemporaryDirectory(prefix="blocks-", dir=self.spill_dir)
+            for name in [column[0] for column in SPILL_COLUMNS] + [SPILL_TEXT_FILE]:
+                open(os.path.join(self._directory.name, name), 'wb').close()
+            np.zeros(1, dtype=np.int64).tofile(os.path.join(self._directory.name, SPILL_OFFSETS_FILE))
+        path = self._directory.name
+
+        remap = np.array([self._font_index.setdefault(font, len(self._font_index)) for font in table.fonts],
+                         dtype=np.int32)
+        columns = {
+            'page_num': table.page_num,
+            'bbox': table.bbox,
+            'font_size': table.font_size,
+            'font_flags': table.font_flags,
+            'line_height': table.line_height,
+            'font_ids': remap[table.font_ids] if len(table) else table.font_ids,
+        }
+        for name, dtype, _ in SPILL_COLUMNS:
+            with open(os.path.join(path, name), 'ab') as f:
+                np.ascontiguousarray(columns[name], dtype=dtype).tofile(f)
+
+        # Character offsets become byte offsets in the UTF-8 text file
+        texts = table.texts()
+        encoded = [text.encode('utf-8') for text in texts]
+        byte_offsets = np.cumsum([len(data) for data in encoded], dtype=np.int64) + self._text_bytes
+        with open(os.path.join(path, SPILL_TEXT_FILE), 'ab') as f:
+            f.write(b"".join(encoded))
+        with open(os.path.join(path, SPILL_OFFSETS_FILE), 'ab') as f:
+            byte_offsets.tofile(f)
+        if len(byte_offsets):
+            self._text_bytes = int(byte_offsets[-1])
@@ -0,0 +1,112 @@
+"""
+Font Statistics Module
+Streaming accumulator for document font statistics (mode, percentiles, mean, max)
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+class FontStatistics:
+    """Font size histogram and font name counts, filled block by block.
+
+    Sizes are bucketed to a fixed resolution; each bucket keeps the first
+    exact size seen as its representative, so mode and percentiles return
+    real sizes from the document. Memory grows with the number of distinct
+    sizes and fonts, not with the number of blocks, and no sort of the
+    block sizes is needed: percentiles walk the few sorted buckets.
+
+    Blocks must be added in document order. The mean is a left-to-right sum
+    of the exact sizes, and ties for the mode go to the size seen first.
+    """
+
+    def __init__(self, resolution: float = 0.001):
+        self.resolution = resolution
+        self.size_buckets: Dict[int, List] = {}  # bucket -> [first exact size, count], first-seen order
+        self.font_counts: Dict[str, int] = {}  # First-seen order
+        self.total = 0.0
+        self.count = 0
+        self.max_size: Optional[float] = None
+
+    def add(self, font_size: float, font_name: str) -> None:
+        """Record one block."""
+        key = round(font_size / self.resolution)
+        bucket = self.size_buckets.get(key)
+        if bucket is None:
+            self.size_buckets[key] = [font_size, 1]
+        else:
+            bucket[1] += 1
+        self.font_counts[font_name] = self.font_counts.get(font_name, 0) + 1
+        self.total += font_size
+        self.count += 1
+        if self.max_size is None or font_size > self.max_size:
+            self.max_size = font_size
+
+    def add_blocks(self, blocks: Iterable) -> None:
+        """Record TextBlock records."""
+        for block in blocks:
+            self.add(block.font_size, block.font_name)
+
+    def add_table(self, table) -> None:
+        """Record every block of a TextBlockTable."""
+        fonts = table.fonts
+        for font_size, font_id in zip(table.font_size.tolist(), table.font_ids.tolist()):
+            self.add(font_size, fonts[font_id])
+
+    @classmethod
+    def from_table(cls, table) -> 'FontStatistics':
+        stats = cls()
+        stats.add_table(table)
+        return stats
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable state, e.g. for the parse cache."""
+        return {
+            "resolution": self.resolution,
+            "size_buckets": [[key, size, count] for key, (size, count) in self.size_buckets.items()],
+            "font_counts": self.font_counts,
+            "total": self.total,
+            "count": self.count,
+            "max_size": self.max_size,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'FontStatistics':
+        """Inverse of to_dict."""
+        stats = cls(state["resolution"])
+        stats.size_buckets = {key: [size, count] for key, size, count in state["size_buckets"]}
+        stats.font_counts = dict(state["font_counts"])
+        stats.total = state["total"]
+        stats.count = state["count"]
+        stats.max_size = state["max_size"]
+        return stats
+
+    def mean(self, default: float = 12.0) -> float:
+        return self.total / self.count if self.count else default
+
+    def mode(self, default: float = 12.0) -> float:
+        """Most common size; ties go to the size seen first."""
+        if not self.count:
+            return default
+        best = None
+        for size, count in self.size_buckets.values():
+            if best is None or count > best[1]:
+                best = (size, count)
+        return best[0]
+
+    def percentile(self, fraction: float, default: float = 12.0) -> float:
+        """Size at index int(count * fraction) of the sorted block sizes."""
+        if not self.count:
+            return default
+        target = int(self.count * fraction)
+        seen = 0
+        for _, (size, count) in sorted(self.size_buckets.items()):
+            seen += count
+            if seen > target:
+                return size
+        return self.max_size
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __repr__(self) -> str:
+        return (f"FontStatistics({self.count} blocks, {len(self.size_buckets)} sizes, "
+                f"{len(self.font_counts)} fonts)")
@@ -4,27 +4,126 @@ Uses multiple heuristics to identify headings in PDF text blocks
 """
 
 import re
+import hashlib
 import logging
-from typing import List, Dict
-from collections import Counter
+from array import array
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 from dataclasses import dataclass
 
-from pdf_parser import DocumentData, TextBlock
+import numpy as np
+
+from annotations import TextAnnotation
+from font_stats import FontStatistics
+from keyword_matcher import KeywordMatcher
+from layout_index import LayoutIndex
+from pdf_parser import DocumentData, PageBatch, ParseCache, ProcessingBudget, TextBlock, TextBlockTable
+from toc_parser import TocEntry
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Fixed layout of HeadingCandidate.feature_vector
+FEATURE_NAMES = (
+    'font_size',
+    'bold',
+    'left_aligned',
+    'top_spacing',
+    'pattern_match',
+    'keyword_match',
+    'capitalization',
+    'length',
+    'numbered',
+)
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+# (feature index, weight) in summation order
+FEATURE_WEIGHTS = tuple((FEATURE_INDEX[name], weight) for name, weight in (
+    ('font_size', 0.20),
+    ('bold', 0.15),
+    ('pattern_match', 0.20),
+    ('keyword_match', 0.15),
+    ('capitalization', 0.10),
+    ('numbered', 0.15),
+    ('left_aligned', 0.03),
+    ('top_spacing', 0.02),
+))
+
+# Features that depend only on a block's stripped text, memoized per document
+TEXT_FEATURES = tuple(FEATURE_INDEX[name] for name in (
+    'pattern_match', 'keyword_match', 'capitalization', 'length', 'numbered'))
+
+CONFIDENCE_THRESHOLD = 0.15  # Lower threshold to catch more headings
+
+@dataclass(slots=True)
 class HeadingCandidate:
     """Represents a potential heading with confidence score."""
     text_block: TextBlock
     confidence: float
     level: str  # H1, H2, H3
-    features: Dict[str, float]
+    feature_vector: array  # array('d') laid out as FEATURE_NAMES
+
+    @property
+    def features(self) -> Dict[str, float]:
+        """Feature values keyed by name."""
+        return dict(zip(FEATURE_NAMES, self.feature_vector))
+
+# Sections kept as candidates whatever their formatting, like numbered sections
+PRIORITY_SECTIONS = ('overview', 'foundation level', 'revision history', 'table of contents',
+                     'acknowledgements', 'references')
+
+_PRIORITY_SECTION = re.compile(r'^(?:' + '|'.join(PRIORITY_SECTIONS) + r')$', re.IGNORECASE)
+# Unnumbered text longer than this cannot be a priority heading
+_PRIORITY_MAX_LENGTH = max(len(section) for section in PRIORITY_SECTIONS)
+_WORD_CHAR = re.compile(r'\w')
+_LETTER = re.compile(r'[A-Z]', re.IGNORECASE)
+
+_DATE = re.compile(r'^\d+\s+\w+\s+\d{4}$')  # "18 JUNE 2013"
+
+def _is_priority_heading(note: TextAnnotation) -> bool:
+    """"1. Introduction", a priority section on its own, "2.1 Intended Audience"."""
+    if note.numbering == "decimal":
+        if not note.spaced:
+            return False
+        if note.depth == 1 and note.trailing_dot:
+            return bool(_WORD_CHAR.match(note.rest))
+        return note.depth == 2 and not note.trailing_dot and bool(_LETTER.match(note.rest))
+    return bool(_PRIORITY_SECTION.match(note.text))
+
+def _is_numbered(note: TextAnnotation) -> bool:
+    """The numbered feature: "1 ", "1. " or "2.1 "."""
+    return (note.numbering == "decimal" and note.spaced and
+            (note.depth == 1 or (note.depth == 2 and not note.trailing_dot)))
+
+def _is_numbered_section(note: TextAnnotation) -> bool:
+    """"1. " or "2.1 ", logged while scoring."""
+    return (note.numbering == "decimal" and note.spaced and
+            note.depth in (1, 2) and note.trailing_dot == (note.depth == 1))
+
+# Leading section number ("2.1 ", "3. ") and non-alphanumerics, ignored when matching ToC titles
+_SECTION_NUMBER = re.compile(r'^\s*\d+(?:\.\d+)*\.?\s*')
+_NON_ALNUM = re.compile(r'[\W_]+')
+
+def _normalize_toc_text(text: str) -> str:
+    return _NON_ALNUM.sub('', text.lower())
+
+class DetectedHeadings(list):
+    """Heading candidates plus how much of the document they cover.
+
+    truncated is set when the document was only partially parsed or heading
+    detection ran out of budget; pages_covered then counts the leading pages
+    whose headings are complete.
+    """
+
+    def __init__(self, candidates: Iterable[HeadingCandidate] = (), truncated: bool = False,
+                 pages_covered: int = 0):
+        super().__init__(candidates)
+        self.truncated = truncated
+        self.pages_covered = pages_covered
 
 class HeadingDetector:
     """Detects headings using multiple heuristic features."""
 
-    def __init__(self):
+    def __init__(self, cache: Optional[ParseCache] = None):
+        self.cache = cache  # Stores per-page scoring results for incrementally parsed documents
         self.heading_patterns = [
             r'^\d+\.\s+[A-Z]',         # 1. Introduction (main sections)
             r'^\d+\.\d+\s+[A-Z]',      # 2.1 Intended Audience (subsections)
@@ -53,153 +152,427 @@ class HeadingDetector:
         self.ignore_texts = {
             "page", "version", "copyright notice", "date", "time"
         }
-
-    def detect_headings(self, doc_data: DocumentData) -> List[HeadingCandidate]:
-        candidates = []
+        self.skip_texts = {'Days', 'Syllabus', 'Identifier', 'Reference'}
+
+        # All heading patterns in one alternation, compiled once
+        self._heading_pattern = re.compile('|'.join(f'(?:{pattern})' for pattern in self.heading_patterns),
+                                           re.IGNORECASE)
+        # English and Japanese keywords in one automaton, searched on lowercased
+        # text: lowercasing leaves Japanese text unchanged
+        self._keyword_matcher = KeywordMatcher(sorted(self.heading_keywords['en']) +
+                                               sorted(self.heading_keywords['ja']))
+
+        self.toc_max_page_offset = 5  # Printed vs physical page numbering difference tried
+        self.toc_min_verified = 0.5  # Share of ToC entries that must be found for the ToC to be used
+
+    def detect_headings(self, doc_data: DocumentData, time_budget: Optional[float] = None,
+                        block_budget: Optional[int] = None) -> DetectedHeadings:
+        """Detect headings across the document.
+
+        With a time budget (seconds) and/or a budget of blocks to score,
+        scoring stops when the budget runs out and the headings found so far
+        are returned, marked truncated with the number of pages covered.
+        """
+        budget = ProcessingBudget.create(time_budget, block_budget)
         stats = self._calculate_document_stats(doc_data)
-
-        for block in doc_data.text_blocks:
-            if self._is_potential_heading(block, stats):
-                candidate = self._analyze_heading_candidate(block, doc_data, stats)
-                
-                # Debug: log numbered patterns
-                text = block.text.strip()
-                if re.match(r'^\d+\.\s+', text) or re.match(r'^\d+\.\d+\s+', text):
-                    logger.info(f"Found numbered section: '{text}' - confidence: {candidate.confidence:.3f}")
-                
-                if candidate.confidence > 0.15:  # Lower threshold to catch more headings
-                    candidates.append(candidate)
-
+        if budget is None and self._can_memoize(doc_data):
+            candidates = self._score_pages_memoized(doc_data, stats)
+            scored = len(doc_data.text_blocks)
+        else:
+            candidates, scored = self._score_blocks(doc_data, stats, budget)
         candidates = self._assign_heading_levels(candidates, doc_data)
         candidates.sort(key=lambda x: (x.text_block.page_num, x.text_block.y_position))
 
+        table = doc_data.text_blocks
+        pages_covered = doc_data.page_count
+        if scored < len(table):
+            # Pages before the first unscored block are complete
+            pages_covered = min(pages_covered, int(table.page_num[scored]) - 1)
+            logger.warning(f"Heading detection budget exhausted after {scored} of {len(table)} blocks")
+
         logger.info(f"Detected {len(candidates)} heading candidates")
+        return DetectedHeadings(candidates, doc_data.truncated or scored < len(table), pages_covered)
+
+    def iter_headings(self, pages: Iterable[PageBatch]) -> Iterator[HeadingCandidate]:
+        """Detect headings incrementally from per-page batches (see PDFParser.iter_pages).
+
+        Document statistics are running values over the pages seen so far, so
+        headings for early pages are yielded before later pages are read and
+        only one page of blocks is held at a time. Results can differ from
+        detect_headings, which sees the whole document's statistics up front.
+        Text annotations are kept per page, so memory does not grow with the
+        number of distinct texts in the document.
+        """
+        running = FontStatistics()
+        total = 0
+
+        for batch in pages:
+            if not len(batch.text_blocks):
+                continue
+
+            running.add_table(batch.text_blocks)
+            page_data = DocumentData(
+                title=batch.title,
+                text_blocks=batch.text_blocks,
+                page_count=batch.page_num,
+                avg_font_size=running.mean(),
+                common_fonts=running.font_counts,
+                font_stats=running
+            )
+            stats = self._calculate_document_stats(page_data)
+            stats['total_blocks'] = running.count
+
+            candidates, _ = self._score_blocks(page_data, stats)
+            candidates = self._assign_heading_levels(candidates, page_data)
+            total += len(candidates)
+            yield from candidates
+
+        logger.info(f"Detected {total} heading candidates")
+
+    def verify_toc_entries(self, doc_data: DocumentData, entries: List[TocEntry]) -> bool:
+        """Locate printed ToC entries (see toc_parser) on their target pages.
+
+        Instead of scoring every block, only the blocks of each entry's
+        target page are checked for the entry's title. The offset between
+        printed and physical page numbers that verifies the most entries is
+        used (ties go to the smallest offset). Sets page and verified on
+        every entry, and returns whether enough entries were found for the
+        ToC to seed the outline.
+        """
+        if not entries:
+            return False
+
+        stats = self._calculate_document_stats(doc_data)
+        toc_pages = {entry.toc_page for entry in entries}
+        offsets = sorted(range(-self.toc_max_page_offset, self.toc_max_page_offset + 1), key=abs)
+
+        best_matches, best_offset, best_count = None, 0, -1
+        for offset in offsets:
+            matches = [self._find_toc_heading(doc_data, entry, entry.printed_page + offset, stats, toc_pages)
+                       for entry in entries]
+            count = sum(match is not None for match in matches)
+            if count > best_count:
+                best_matches, best_offset, best_count = matches, offset, count
+
+        for entry, block in zip(entries, best_matches):
+            entry.verified = block is not None
+            entry.page = block.page_num if block is not None else entry.printed_page + best_offset
+
+        logger.info(f"Verified {best_count} of {len(entries)} ToC entries (page offset {best_offset})")
+        return best_count >= self.toc_min_verified * len(entries)
+
+    def _find_toc_heading(self, doc_data: DocumentData, entry: TocEntry, page_num: int, stats: Dict,
+                          toc_pages: set) -> Optional[TextBlock]:
+        """Block on page_num that carries the entry's title, if any.
+
+        A block matches when its text, minus any leading section number,
+        equals the title ignoring case and punctuation. A block holding the
+        first half or more of the title (titles wrapped over two lines)
+        also matches if it passes the usual heading filter.
+        """
+        if page_num < 1 or page_num > doc_data.page_count or page_num in toc_pages:
+            return None
+
+        title = _normalize_toc_text(entry.title)
+        if not title:
+            return None
+
+        table = doc_data.text_blocks
+        start, end = table.page_bounds(page_num)
+        for index in range(start, end):
+            text = _normalize_toc_text(_SECTION_NUMBER.sub('', table.text(index)))
+            if not text:
+                continue
+            if text == title:
+                return table[index]
+            if (len(text) >= len(title) / 2 and title.startswith(text)
+                    and self._is_potential_heading(table[index], stats)):
+                return table[index]
+        return None
+
+    def _can_memoize(self, doc_data: DocumentData) -> bool:
+        """Whether per-page results can be reused: needs a cache and a fingerprint for every page."""
+        return (self.cache is not None and not doc_data.truncated and doc_data.page_keys is not None
+                and len(doc_data.page_keys) == doc_data.page_count)
+
+    def _score_pages_memoized(self, doc_data: DocumentData, stats: Dict) -> List[HeadingCandidate]:
+        """Score page by page, reusing stored results for unchanged pages.
+
+        A page's candidates depend only on its own blocks (top spacing looks
+        within the page) and the body font size, so they are stored under
+        the page fingerprint plus body size and detector configuration. After
+        a small edit only the changed pages are rescored; a change to the
+        body font size rescores everything.
+        """
+        table = doc_data.text_blocks
+        config = self._config_fingerprint()
+        candidates = []
+        reused = 0
+
+        for page_num, page_key in enumerate(doc_data.page_keys, start=1):
+            start, end = table.page_bounds(page_num)
+            if start == end:
+                continue
+            memo_key = hashlib.sha256(
+                repr(("headings", config, page_key, stats['body_font_size'])).encode('utf-8')).hexdigest()
+            memo = self.cache.get_record(memo_key)
+
+            if memo is None:
+                rows, page_candidates, _ = self._score_rows(doc_data, stats, bounds=(start, end))
+                self.cache.put_record(memo_key, {}, {
+                    'rows': np.array(rows, dtype=np.int64) - start,
+                    'confidences': np.array([c.confidence for c in page_candidates], dtype=np.float64),
+                    'features': np.array([c.feature_vector for c in page_candidates],
+                                         dtype=np.float64).reshape(-1, len(FEATURE_NAMES)),
+                }, evict=False)
+                candidates.extend(page_candidates)
+                continue
+
+            reused += 1
+            _, arrays = memo
+            for index, confidence, features in zip(arrays['rows'].tolist(), arrays['confidences'].tolist(),
+                                                   arrays['features']):
+                candidates.append(HeadingCandidate(
+                    text_block=table[start + index],
+                    confidence=confidence,
+                    level="H1",
+                    feature_vector=array('d', features.tolist())
+                ))
+
+        self.cache.evict()
+        logger.debug(f"Reused heading scores for {reused} of {doc_data.page_count} pages")
         return candidates
 
+    def _config_fingerprint(self) -> str:
+        """Hash of the detector settings that scoring depends on."""
+        config = (
+            self.heading_patterns,
+            {lang: sorted(words) for lang, words in self.heading_keywords.items()},
+            sorted(self.stop_words),
+            sorted(self.ignore_texts),
+            sorted(self.skip_texts),
+            FEATURE_WEIGHTS,
+        )
+        return hashlib.sha256(repr(config).encode('utf-8')).hexdigest()
+
+    def _score_blocks(self, doc_data: DocumentData, stats: Dict, budget: Optional[ProcessingBudget] = None,
+                      bounds: Optional[Tuple[int, int]] = None) -> Tuple[List[HeadingCandidate], int]:
+        """Score blocks in order and keep candidates above the confidence threshold.
+
+        Scores the blocks in the index range bounds (default: every block of
+        doc_data). Returns the candidates and the number of blocks scored,
+        which is less than the block count only if the budget ran out.
+        """
+        _, candidates, scored = self._score_rows(doc_data, stats, budget, bounds)
+        return candidates, scored
+
+    def _score_rows(self, doc_data: DocumentData, stats: Dict, budget: Optional[ProcessingBudget] = None,
+                    bounds: Optional[Tuple[int, int]] = None) -> Tuple[List[int], List[HeadingCandidate], int]:
+        """_score_blocks, also returning the table index of each candidate.
+
+        Blocks are filtered one by one (the budget counts filtered blocks),
+        then the potential headings are scored together in one batch. Under
+        a budget the batches are single pages, sliced from the table as
+        they are reached, and the budget is checked between them, so no
+        page past the deadline is built or scored.
+        """
+        table = doc_data.text_blocks
+        start, end = bounds if bounds is not None else (0, len(table))
+        rows, candidates = [], []
+        scored = 0
+
+        for batch_start, batch_end in self._batch_bounds(table, start, end, per_page=budget is not None):
+            batch_rows, blocks = [], []
+            exhausted = False
+            for row, block in enumerate(table[batch_start:batch_end], batch_start):
+                if budget is not None and budget.exhausted(scored):
+                    exhausted = True
+                    break
+                scored += 1
+
+                if self._is_potential_heading(block, stats):
+                    batch_rows.append(row)
+                    blocks.append(block)
+
+            kept = self._score_batch(doc_data, stats, batch_rows, blocks)
+            rows.extend(batch_rows[i] for i, _ in kept)
+            candidates.extend(candidate for _, candidate in kept)
+            if exhausted:
+                break
+
+        return rows, candidates, scored
+
+    @staticmethod
+    def _batch_bounds(table: TextBlockTable, start: int, end: int, per_page: bool) -> List[Tuple[int, int]]:
+        """Index ranges covering [start, end): one per page, or a single range."""
+        if not per_page or start >= end:
+            return [(start, end)]
+        page_num = table.page_num[start:end]
+        cuts = (np.flatnonzero(page_num[1:] != page_num[:-1]) + start + 1).tolist()
+        return list(zip([start] + cuts, cuts + [end]))
+
+    def _score_batch(self, doc_data: DocumentData, stats: Dict, rows: List[int],
+                     blocks: List[TextBlock]) -> List[Tuple[int, HeadingCandidate]]:
+        """Score potential headings together; (position in blocks, candidate) for those above the threshold."""
+        confidence, features = self._score_candidates(doc_data, stats, blocks, rows)
+
+        # Debug: log numbered patterns
+        annotations = stats['annotations']
+        for i, block in enumerate(blocks):
+            note = annotations.get(block.text)
+            if _is_numbered_section(note):
+                logger.info(f"Found numbered section: '{note.text}' - confidence: {confidence[i]:.3f}")
+
+        kept = np.flatnonzero(confidence > CONFIDENCE_THRESHOLD).tolist()
+        return [(i, self._make_candidate(blocks[i], confidence[i], features[i])) for i in kept]
+
     def _calculate_document_stats(self, doc_data: DocumentData) -> Dict:
-        font_sizes = [block.font_size for block in doc_data.text_blocks]
-        font_size_counts = Counter(font_sizes)
-        body_font_size = font_size_counts.most_common(1)[0][0]
-        sorted_sizes = sorted(font_sizes)
-        n = len(sorted_sizes)
+        # Read off the histogram filled during parsing; no sort of the block sizes
+        font_stats = doc_data.font_stats
 
         return {
-            'body_font_size': body_font_size,
+            'body_font_size': font_stats.mode(),
             'avg_font_size': doc_data.avg_font_size,
-            'font_size_75th': sorted_sizes[int(n * 0.75)] if n > 0 else 12,
-            'font_size_90th': sorted_sizes[int(n * 0.9)] if n > 0 else 14,
-            'max_font_size': max(font_sizes) if font_sizes else 12,
+            'font_size_75th': font_stats.percentile(0.75, default=12),
+            'font_size_90th': font_stats.percentile(0.9, default=14),
+            'max_font_size': font_stats.max_size if font_stats.count else 12,
             'common_fonts': doc_data.common_fonts,
-            'total_blocks': len(doc_data.text_blocks)
+            'total_blocks': len(doc_data.text_blocks),
+            'layout': LayoutIndex(doc_data.text_blocks),  # Pages indexed on first use
+            'annotations': doc_data.annotations,
+            'text_features': {}  # Stripped text -> TEXT_FEATURES values
         }
 
     def _is_potential_heading(self, block: TextBlock, stats: Dict) -> bool:
+        """Staged filter, cheapest checks first.
+
+        Text without a significant formatting difference can only qualify
+        through a priority pattern, which needs a leading digit or a short
+        text, so most body text is rejected on size, flags and length alone
+        without any regex.
+        """
         text = block.text.strip()
 
         if len(text) < 3:
             return False
 
-        text_lower = text.lower()
+        formatted = block.font_size > stats['body_font_size'] * 1.1 or block.is_bold
+        if not formatted and not (text[0].isdigit() or len(text) <= _PRIORITY_MAX_LENGTH):
+            return False
+
+        note = stats['annotations'].get(text)
+        text_lower = note.lower
         if text_lower in self.ignore_texts:
             return False
 
         # High priority headings - always include
-        high_priority = [
-            # Main numbered sections
-            r'^\d+\.\s+\w+',  # "1. Introduction", "2. Introduction", etc.
-            # Important document sections
-            r'^(overview|foundation level|revision history|table of contents|acknowledgements|references)$',
-            # Subsection patterns
-            r'^\d+\.\d+\s+[A-Z]',  # "2.1 Intended Audience"
-        ]
-        
-        for pattern in high_priority:
-            if re.match(pattern, text, re.IGNORECASE):
-                return True
+        if _is_priority_heading(note):
+            return True
+
+        # For remaining text, require significant formatting difference
+        if not formatted:
+            return False
 
         # Skip very long text that's likely body text
         if len(text) > 100:
             return False
 
         # Skip pure numbers, dates, and common non-headings
-        if (text.isdigit() or 
-            re.match(r'^\d+\s+\w+\s+\d{4}$', text) or  # dates like "18 JUNE 2013"
-            text in ['Days', 'Syllabus', 'Identifier', 'Reference'] or
-            '...........' in text):  # table of contents dots
+        if (text.isdigit() or
+            text in self.skip_texts or
+            '...........' in text or  # table of contents dots
+            (note.numbering == "decimal" and _DATE.match(text))):
             return False
 
-        # For remaining text, require significant formatting difference
-        if block.font_size > stats['body_font_size'] * 1.1 or block.is_bold:
-            # Additional filters for formatted text
-            if (text_lower.startswith(('this ', 'the ', 'in ', 'that ', 'each ', 'all ')) or
-                text_lower.endswith((' is', ' are', ' will', ' can', ' may')) or
-                len(text.split()) > 15):  # Too many words for a heading
-                return False
-            return True
-
-        return False
+        # Additional filters for formatted text
+        if (text_lower.startswith(('this ', 'the ', 'in ', 'that ', 'each ', 'all ')) or
+            text_lower.endswith((' is', ' are', ' will', ' can', ' may')) or
+            note.word_count > 15):  # Too many words for a heading
+            return False
+        return True
 
     def _analyze_heading_candidate(self, block: TextBlock, doc_data: DocumentData, stats: Dict) -> HeadingCandidate:
-        text = block.text.strip()
-        features = {}
-
-        size_ratio = block.font_size / stats['body_font_size']
-        features['font_size'] = min(size_ratio - 1, 1.0) if size_ratio > 1 else 0
-        features['bold'] = 1.0 if block.is_bold else 0.0
-        features['left_aligned'] = 1.0 if block.x_position < 100 else 0.5
-        features['top_spacing'] = self._calculate_top_spacing(block, doc_data)
-        features['pattern_match'] = self._check_heading_patterns(text)
-        features['keyword_match'] = self._check_heading_keywords(text)
-        features['capitalization'] = self._check_capitalization(text)
-        features['length'] = self._calculate_length_score(text)
-        features['numbered'] = 1.0 if re.match(r'^\d+\.?\s+', text) or re.match(r'^\d+\.\d+\s+', text) else 0.0
-
-        weights = {
-            'font_size': 0.20,
-            'bold': 0.15,
-            'pattern_match': 0.20,
-            'keyword_match': 0.15,
-            'capitalization': 0.10,
-            'numbered': 0.15,
-            'left_aligned': 0.03,
-            'top_spacing': 0.02
-        }
-
-        confidence = sum(features[key] * weights[key] for key in weights)
-
+        """Score a single block, whatever its confidence."""
+        confidence, features = self._score_candidates(doc_data, stats, [block])
+        return self._make_candidate(block, confidence[0], features[0])
+
+    def _score_candidates(self, doc_data: DocumentData, stats: Dict, blocks: List[TextBlock],
+                          rows: Optional[List[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Feature matrix (one row per block, FEATURE_NAMES columns) and confidences.
+
+        Font size, bold and alignment are computed on whole columns, read
+        from the block table at rows when given, and top spacing per block.
+        Text features are computed once per distinct text in the document
+        (running headers, footers and titles repeat on every page).
+        Confidences accumulate the weighted columns in FEATURE_WEIGHTS
+        order, so every value is bit-identical to a per-block left-to-right
+        sum.
+        """
+        features = np.empty((len(blocks), len(FEATURE_NAMES)))
+        if not blocks:
+            return np.zeros(0), features
+
+        if rows is not None:
+            table = doc_data.text_blocks
+            rows = np.asarray(rows, dtype=np.int64)
+            font_size, font_flags, x0 = table.font_size[rows], table.font_flags[rows], table.x0[rows]
+        else:
+            font_size = np.array([block.font_size for block in blocks], dtype=np.float64)
+            font_flags = np.array([block.font_flags for block in blocks], dtype=np.int32)
+            x0 = np.array([block.x_position for block in blocks], dtype=np.float64)
+
+        size_ratio = font_size / stats['body_font_size']
+        features[:, FEATURE_INDEX['font_size']] = np.where(size_ratio > 1, np.minimum(size_ratio - 1, 1.0), 0.0)
+        features[:, FEATURE_INDEX['bold']] = np.where(font_flags & 2**4, 1.0, 0.0)
+        features[:, FEATURE_INDEX['left_aligned']] = np.where(x0 < 100, 1.0, 0.5)
+        features[:, FEATURE_INDEX['top_spacing']] = [self._calculate_top_spacing(block, stats['layout'])
+                                                     for block in blocks]
+        annotations = stats['annotations']
+        features[:, TEXT_FEATURES] = [self._text_features(annotations.get(block.text), stats['text_features'])
+                                      for block in blocks]
+
+        confidence = np.zeros(len(blocks))
+        for index, weight in FEATURE_WEIGHTS:
+            confidence += features[:, index] * weight
+        return confidence, features
+
+    def _text_features(self, note: TextAnnotation, memo: Dict[str, Tuple[float, ...]]) -> Tuple[float, ...]:
+        """Values of TEXT_FEATURES for an annotated text, computed once per document."""
+        values = memo.get(note.text)
+        if values is None:
+            values = (
+                self._check_heading_patterns(note.text),      # pattern_match
+                self._check_heading_keywords(note.lower),     # keyword_match
+                self._check_capitalization(note.text),        # capitalization
+                self._calculate_length_score(note.text),      # length
+                1.0 if _is_numbered(note) else 0.0,           # numbered
+            )
+            memo[note.text] = values
+        return values
+
+    def _make_candidate(self, block: TextBlock, confidence: float, features: np.ndarray) -> HeadingCandidate:
         return HeadingCandidate(
             text_block=block,
-            confidence=confidence,
+            confidence=float(confidence),
             level="H1",  # temp, assigned properly later
-            features=features
+            feature_vector=array('d', features.tolist())
         )
 
-    def _calculate_top_spacing(self, block: TextBlock, doc_data: DocumentData) -> float:
-        same_page_blocks = [b for b in doc_data.text_blocks if b.page_num == block.page_num]
-        above_blocks = [b for b in same_page_blocks if b.y_position < block.y_position and abs(b.x_position - block.x_position) < 50]
-
-        if not above_blocks:
+    def _calculate_top_spacing(self, block: TextBlock, layout: LayoutIndex) -> float:
+        closest = layout.nearest_above(block.page_num, block.x_position, block.y_position, 50)
+        if closest is None:
             return 1.0
 
-        closest_above = min(above_blocks, key=lambda b: block.y_position - b.y_position)
-        spacing = block.y_position - (closest_above.y_position + closest_above.height)
+        closest_y = float(layout.table.y0[closest])
+        closest_height = float(layout.table.y1[closest]) - closest_y
+        spacing = block.y_position - (closest_y + closest_height)
         return min(spacing / 20.0, 1.0) if spacing > 0 else 0.0
 
     def _check_heading_patterns(self, text: str) -> float:
-        for pattern in self.heading_patterns:
-            if re.match(pattern, text, re.IGNORECASE):
-                return 1.0
-        return 0.0
-
-    def _check_heading_keywords(self, text: str) -> float:
-        text_lower = text.lower()
-        for keyword in self.heading_keywords['en']:
-            if keyword in text_lower:
-                return 1.0
-        for keyword in self.heading_keywords['ja']:
-            if keyword in text:
-                return 1.0
-        return 0.0
+        return 1.0 if self._heading_pattern.match(text) else 0.0
+
+    def _check_heading_keywords(self, text_lower: str) -> float:
+        return 1.0 if self._keyword_matcher.contains_any(text_lower) else 0.0
 
     def _check_capitalization(self, text: str) -> float:
         if text.isupper() and len(text) > 3:
@@ -226,14 +599,15 @@ class HeadingDetector:
             return candidates
 
         for candidate in candidates:
-            text = candidate.text_block.text.strip()
+            note = doc_data.annotations.get(candidate.text_block.text)
 
             # Strict number pattern detection
-            if re.match(r'^\d+\.\d+\.\d+\s+', text):  # e.g., 2.1.1
+            numbered = note.numbering == "decimal" and note.spaced
+            if numbered and note.depth == 3 and not note.trailing_dot:    # e.g., 2.1.1
                 candidate.level = "H3"
-            elif re.match(r'^\d+\.\d+\s+', text):      # e.g., 2.1
+            elif numbered and note.depth == 2 and not note.trailing_dot:  # e.g., 2.1
                 candidate.level = "H2"
-            elif re.match(r'^\d+\s', text) or re.match(r'^\d+\.\s', text):  # e.g., 1 or 1.
+            elif numbered and note.depth == 1:                            # e.g., 1 or 1.
                 candidate.level = "H1"
             else:
                 # fallback: font size
@@ -0,0 +1,108 @@
+"""
+Keyword Matcher Module
+Aho-Corasick automaton reporting every keyword that occurs in a text in one pass
+"""
+
+from typing import Dict, List, Sequence
+
+class KeywordMatcher:
+    """Substring matcher for a fixed keyword list, built once.
+
+    The keywords are compiled into an Aho-Corasick automaton whose failure
+    links are folded into a full transition table, so a search is one dict
+    lookup per character of the text, however many keywords there are.
+    Matching is case-sensitive substring matching, exactly like
+    `keyword in text`; callers lowercase both sides when needed.
+
+    Results are positions in the keyword list, so duplicate keywords are
+    reported once per occurrence in the list.
+    """
+
+    def __init__(self, keywords: Sequence[str]):
+        self.keywords = list(keywords)
+        self._always = tuple(i for i, keyword in enumerate(self.keywords) if not keyword)
+
+        # Trie of the keywords
+        children: List[Dict[str, int]] = [{}]
+        ends: List[List[int]] = [[]]
+        for position, keyword in enumerate(self.keywords):
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                child = children[state].get(char)
+                if child is None:
+                    child = len(children)
+                    children[state][char] = child
+                    children.append({})
+                    ends.append([])
+                state = child
+            ends[state].append(position)
+
+        # Breadth-first, so a state's failure state (always shallower) is complete
+        # before the state inherits its transitions and outputs
+        transitions: List[Dict[str, int]] = [dict(children[0])] + [{} for _ in children[1:]]
+        outputs: List[tuple] = [()] * len(children)
+        queue = [(child, 0) for child in children[0].values()]
+        for child, _ in queue:
+            outputs[child] = tuple(ends[child])
+        for state, fail in queue:
+            transitions[state] = {**transitions[fail], **children[state]}
+            for char, child in children[state].items():
+                child_fail = transitions[fail].get(char, 0)
+                outputs[child] = tuple(ends[child]) + outputs[child_fail]
+                queue.append((child, child_fail))
+
+        self._transitions = transitions  # state -> char -> state; chars not listed go to the root
+        self._outputs = outputs  # state -> positions of the keywords ending there
+
+    def find(self, text: str) -> List[int]:
+        """Positions (ascending) of the keywords occurring in text."""
+        transitions, outputs = self._transitions, self._outputs
+        found = set(self._always)
+        state = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return sorted(found)
+
+    def count(self, text: str) -> int:
+        """Number of keywords occurring in text, duplicates counted: sum(k in text for k in keywords)."""
+        return len(self.find(text))
+
+    def contains_any(self, text: str) -> bool:
+        """Whether any keyword occurs in text; stops at the first hit."""
+        if self._always:
+            return True
+        transitions, outputs = self._transitions, self._outputs
+        state = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def __repr__(self) -> str:
+        return f"KeywordMatcher({len(self.keywords)} keywords, {len(self._transitions)} states)"
+
+class KeywordGroups:
+    """Several named keyword lists searched together in a single pass."""
+
+    def __init__(self, groups: Dict[str, Sequence[str]]):
+        self.groups = {name: list(keywords) for name, keywords in groups.items()}
+        self._ranges: Dict[str, range] = {}
+        combined = []
+        for name, keywords in self.groups.items():
+            self._ranges[name] = range(len(combined), len(combined) + len(keywords))
+            combined.extend(keywords)
+        self.matcher = KeywordMatcher(combined)
+
+    def find(self, text: str) -> Dict[str, List[int]]:
+        """For each group, the positions (ascending) of its keywords occurring in text."""
+        positions = self.matcher.find(text)
+        return {name: [position - span.start for position in positions if position in span]
+                for name, span in self._ranges.items()}
@@ -0,0 +1,103 @@
+"""
+Layout Index Module
+Per-page spatial index over a TextBlockTable for layout queries
+"""
+
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from block_table import TextBlockTable
+
+class _PageIndex:
+    """Blocks of one page bucketed by x0, each bucket sorted by (y0, index)."""
+
+    __slots__ = ('buckets',)
+
+    def __init__(self, x0: np.ndarray, y0: np.ndarray, start: int, bucket_width: float):
+        # bucket -> (y0 values, x0 values, table indices), all in (y0, index) order
+        self.buckets: Dict[int, Tuple[List[float], List[float], List[int]]] = {}
+        keys = np.floor(x0 / bucket_width).astype(np.int64)
+        order = np.lexsort((np.arange(len(x0)), y0, keys))
+        keys, xs, ys = keys[order].tolist(), x0[order].tolist(), y0[order].tolist()
+        indices = (order + start).tolist()
+
+        first = 0
+        for i in range(1, len(keys) + 1):
+            if i == len(keys) or keys[i] != keys[first]:
+                self.buckets[keys[first]] = (ys[first:i], xs[first:i], indices[first:i])
+                first = i
+
+class LayoutIndex:
+    """Spatial index of a document's blocks, built lazily page by page.
+
+    Blocks of a page are bucketed by left edge into bucket_width columns and
+    sorted by top edge, so a query bisects the few columns in its x range
+    instead of scanning the page. A page is indexed on its first query;
+    later queries on the page cost O(log n) plus the blocks skipped in the
+    two partially covered columns at the ends of the range.
+
+    Only the max_pages most recently queried pages stay indexed. Scoring
+    visits pages in order, so memory stays at a page's worth of lists
+    however long the document is.
+    """
+
+    def __init__(self, table: TextBlockTable, bucket_width: float = 12.5, max_pages: int = 2):
+        self.table = table
+        self.bucket_width = bucket_width
+        self.max_pages = max_pages
+        self._pages: Dict[int, _PageIndex] = OrderedDict()
+
+    def nearest_above(self, page_num: int, x: float, y: float, max_dx: float) -> Optional[int]:
+        """Table index of the closest block above y whose left edge is within max_dx of x.
+
+        "Above" means top edge y0 < y, "closest" the largest such y0. Among
+        blocks at the same y0 the one first in table order wins, matching an
+        argmin over the page's blocks. Returns None if no block qualifies.
+        """
+        page = self._page(page_num)
+        best_y, best_index = None, None
+
+        # The margin keeps blocks whose distance rounds below max_dx in range
+        margin = 1e-6 * (1.0 + abs(x) + max_dx)
+        first = int(np.floor((x - max_dx - margin) / self.bucket_width))
+        last = int(np.floor((x + max_dx + margin) / self.bucket_width))
+        for key in range(first, last + 1):
+            bucket = page.buckets.get(key)
+            if bucket is None:
+                continue
+            ys, xs, indices = bucket
+
+            i = bisect_left(ys, y) - 1
+            while i >= 0 and not abs(xs[i] - x) < max_dx:
+                i -= 1
+            if i < 0 or (best_y is not None and ys[i] < best_y):
+                continue
+
+            # Walk back over equal y0 for the earliest block in table order
+            found_y, found_index = ys[i], indices[i]
+            i -= 1
+            while i >= 0 and ys[i] == found_y:
+                if abs(xs[i] - x) < max_dx:
+                    found_index = indices[i]
+                i -= 1
+
+            if best_y is None or found_y > best_y or found_index < best_index:
+                best_y, best_index = found_y, found_index
+
+        return best_index
+
+    def _page(self, page_num: int) -> _PageIndex:
+        page = self._pages.get(page_num)
+        if page is not None:
+            self._pages.move_to_end(page_num)
+            return page
+
+        start, end = self.table.page_bounds(page_num)
+        page = _PageIndex(self.table.x0[start:end], self.table.y0[start:end], start, self.bucket_width)
+        self._pages[page_num] = page
+        if len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return page
@@ -5,16 +5,20 @@ Extracts structured outlines from PDFs in /app/input and outputs JSON to /app/ou
 """
 
 import os
-import json
+import sys
 import time
 import logging
+import argparse
 from pathlib import Path
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-from pdf_parser import PDFParser
+from pdf_parser import PDFParser, ParseCache, DocumentData, EXTRACTION_PROFILES
 from heading_detector import HeadingDetector
 from outline_extractor import OutlineExtractor
+from toc_parser import PrintedTocParser
+from running_text import RunningTextFilter
+from outline_writer import JsonFileWriter, NdjsonWriter, OutlineWriter
 
 # Configure logging
 logging.basicConfig(
@@ -23,8 +27,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def process_pdf_file(input_path: str, output_path: str) -> bool:
-    """Process a single PDF file and extract its outline."""
+def process_pdf_file(input_path: str, output_path: str, parser: Optional[PDFParser] = None,
+                     use_mmap: bool = False, time_budget: Optional[float] = None,
+                     block_budget: Optional[int] = None, outline_source: str = "detect",
+                     suppress_running_text: bool = False, writer: Optional[OutlineWriter] = None) -> bool:
+    """Process a single PDF file and extract its outline.
+
+    time_budget (seconds) and block_budget bound parsing plus heading
+    detection; when either runs out, a partial outline is written and marked
+    truncated. With outline_source="bookmarks", a plausible embedded table
+    of contents is written as the outline directly; with "toc", a printed
+    dotted-leader table of contents is, once its entries are verified on
+    their target pages. Documents without one go through heading detection.
+    suppress_running_text removes running headers and footers (see
+    RunningTextFilter) before the outline is built. writer (see
+    outline_writer) defaults to one JSON file at output_path.
+    """
     try:
         start_time = time.time()
         logger.info(f"Starting processing: {os.path.basename(input_path)}")
@@ -41,50 +59,212 @@ def process_pdf_file(input_path: str, output_path: str) -> bool:
             
         logger.debug(f"Processing PDF file: {file_size} bytes")
         
+        if parser is None:
+            parser = PDFParser()
+
+        if outline_source == "bookmarks":
+            bookmarks = parser.read_bookmarks(input_path)
+            if bookmarks is not None:
+                outline = OutlineExtractor().create_outline_from_bookmarks(bookmarks)
+                return _save_outline(outline, input_path, output_path, start_time, writer)
+            logger.info(f"No usable bookmarks, detecting headings: {os.path.basename(input_path)}")
+
         # Parse PDF
-        parser = PDFParser()
-        document_data = parser.parse_pdf(input_path)
-        
-        if not document_data:
-            logger.error(f"Failed to parse PDF: {input_path}")
-            return False
-        
-        logger.debug(f"Parsed PDF with {document_data.page_count} pages, {len(document_data.text_blocks)} text blocks")
-        
-        # Detect headings
-        detector = HeadingDetector()
-        headings = detector.detect_headings(document_data)
-        
-        if not headings:
-            logger.warning(f"No headings detected in: {input_path}")
-            # Still create output with empty outline
-            headings = []
-        
-        # Extract structured outline
-        extractor = OutlineExtractor()
-        outline = extractor.create_outline(document_data, headings)
-        
-        # Ensure output directory exists
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        parse = parser.parse_mmap if use_mmap else parser.parse_pdf
+        document_data = parse(input_path, time_budget, block_budget)
+        if suppress_running_text and document_data:
+            document_data = RunningTextFilter().apply(document_data)
+        timings = {"parse": time.time() - start_time}
+        detector = HeadingDetector(cache=parser.cache if parser.incremental else None)
+
+        if outline_source == "toc" and document_data and not document_data.truncated:
+            entries = PrintedTocParser().find_entries(document_data, input_path, parser.extraction_profile)
+            if detector.verify_toc_entries(document_data, entries):
+                outline = OutlineExtractor().create_outline_from_toc(document_data, entries)
+                return _save_outline(outline, input_path, output_path, start_time, writer, timings)
+            logger.info(f"No usable printed table of contents, detecting headings: {os.path.basename(input_path)}")
         
-        # Save to JSON with proper encoding
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(outline, f, indent=2, ensure_ascii=False)
+        return _write_outline(document_data, input_path, output_path, start_time, time_budget, block_budget,
+                              detector, writer, timings)
         
+    except Exception as e:
+        logger.error(f"❌ Error processing {input_path}: {str(e)}")
+        return False
+
+def process_pdf_bytes(data, name: str, output_path: str, parser: Optional[PDFParser] = None,
+                      time_budget: Optional[float] = None, block_budget: Optional[int] = None,
+                      suppress_running_text: bool = False, writer: Optional[OutlineWriter] = None) -> bool:
+    """Process a PDF held in memory (any bytes-like object) and extract its outline."""
+    try:
+        start_time = time.time()
+        logger.info(f"Starting processing: {name}")
+
+        if parser is None:
+            parser = PDFParser()
+        document_data = parser.parse_bytes(data, name, time_budget, block_budget)
+        if suppress_running_text and document_data:
+            document_data = RunningTextFilter().apply(document_data)
+        timings = {"parse": time.time() - start_time}
+        detector = HeadingDetector(cache=parser.cache if parser.incremental else None)
+
+        return _write_outline(document_data, name, output_path, start_time, time_budget, block_budget,
+                              detector, writer, timings)
+
+    except Exception as e:
+        logger.error(f"❌ Error processing {name}: {str(e)}")
+        return False
+
+def process_pdf_title(input_path: str, output_path: str, parser: Optional[PDFParser] = None,
+                      writer: Optional[OutlineWriter] = None) -> bool:
+    """Extract only the title of a PDF and write it as {"title": ...} JSON.
+
+    Reads metadata, or page 0 when metadata has no title, and never parses
+    later pages or detects headings, so large batches stay cheap.
+    """
+    try:
+        start_time = time.time()
+        if parser is None:
+            parser = PDFParser()
+
+        title = parser.read_title(input_path)
+        if title is None:
+            logger.error(f"Failed to read title: {input_path}")
+            return False
+
+        record = OutlineExtractor().create_title_record(title)
+        if writer is None:
+            writer = JsonFileWriter()
         processing_time = time.time() - start_time
-        logger.info(f"✅ Processed {os.path.basename(input_path)} in {processing_time:.2f}s → {len(outline['outline'])} headings")
-        
+        writer.write(input_path, record, output_path, {"total": round(processing_time, 4)})
+
+        logger.debug(f"Read title of {os.path.basename(input_path)} in {processing_time:.3f}s")
         return True
-        
+
     except Exception as e:
         logger.error(f"❌ Error processing {input_path}: {str(e)}")
         return False
 
-def main():
+def _write_outline(document_data: Optional[DocumentData], name: str, output_path: str,
+                   start_time: float, time_budget: Optional[float] = None,
+                   block_budget: Optional[int] = None, detector: Optional[HeadingDetector] = None,
+                   writer: Optional[OutlineWriter] = None, timings: Optional[Dict[str, float]] = None) -> bool:
+    """Detect headings in a parsed document and write its outline JSON.
+
+    Heading detection gets whatever is left of the time budget. Partial
+    outlines carry "truncated": true and the number of pages covered.
+    """
+    if not document_data:
+        logger.error(f"Failed to parse PDF: {name}")
+        return False
+    
+    logger.debug(f"Parsed PDF with {document_data.page_count} pages, {len(document_data.text_blocks)} text blocks")
+    
+    # Detect headings
+    if detector is None:
+        detector = HeadingDetector()
+    if time_budget is not None:
+        time_budget = max(time_budget - (time.time() - start_time), 0.0)
+    detect_start = time.time()
+    headings = detector.detect_headings(document_data, time_budget, block_budget)
+    if timings is not None:
+        timings["detect"] = time.time() - detect_start
+    truncated, pages_covered = headings.truncated, headings.pages_covered
+    
+    if not headings:
+        logger.warning(f"No headings detected in: {name}")
+        # Still create output with empty outline
+        headings = []
+    
+    # Extract structured outline
+    extractor = OutlineExtractor()
+    outline = extractor.create_outline(document_data, headings)
+    if truncated:
+        outline["truncated"] = True
+        outline["pages_covered"] = pages_covered
+        logger.warning(f"Partial outline for {name}: {pages_covered} pages covered")
+    
+    return _save_outline(outline, name, output_path, start_time, writer, timings)
+
+def _save_outline(outline: Dict[str, Any], name: str, output_path: str, start_time: float,
+                  writer: Optional[OutlineWriter] = None, timings: Optional[Dict[str, float]] = None) -> bool:
+    """Write an outline through writer, by default as a JSON file at output_path.
+
+    timings (seconds per stage) gets the total added and is recorded by
+    writers that keep it, such as NdjsonWriter.
+    """
+    if writer is None:
+        writer = JsonFileWriter()
+    processing_time = time.time() - start_time
+    timings = {stage: round(seconds, 4) for stage, seconds in (timings or {}).items()}
+    timings["total"] = round(processing_time, 4)
+    writer.write(name, outline, output_path, timings)
+    
+    logger.info(f"✅ Processed {os.path.basename(name)} in {processing_time:.2f}s → {len(outline['outline'])} headings")
+    
+    return True
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line options."""
+    arg_parser = argparse.ArgumentParser(description="Extract structured outlines from PDFs")
+    arg_parser.add_argument("--input-dir", default="C:/Users/ANSHU/personal/personal/scripts/app/input",
+                            help="Directory containing input PDFs")
+    arg_parser.add_argument("--output-dir", default="C:/Users/ANSHU/personal/personal/scripts/app/output",
+                            help="Directory for output JSON files")
+    arg_parser.add_argument("--cache-dir", default=None,
+                            help="Enable the on-disk parse cache in this directory")
+    arg_parser.add_argument("--cache-size-mb", type=int, default=256,
+                            help="Maximum parse cache size before LRU eviction")
+    arg_parser.add_argument("--max-pages", type=int, default=50,
+                            help="Page budget per document, 0 for no limit")
+    arg_parser.add_argument("--workers", type=int, default=1,
+                            help="Processes used to extract the pages of one document")
+    arg_parser.add_argument("--profile", choices=sorted(EXTRACTION_PROFILES), default="full",
+                            help="Text extraction profile; 'text' skips image payloads")
+    arg_parser.add_argument("--mmap", action="store_true",
+                            help="Hash input PDFs for the parse cache through memory maps instead of file reads")
+    arg_parser.add_argument("--time-budget", type=float, default=None,
+                            help="Seconds allowed per document; partial outlines are marked truncated")
+    arg_parser.add_argument("--block-budget", type=int, default=None,
+                            help="Text blocks processed per document before stopping early")
+    arg_parser.add_argument("--spill-mb", type=int, default=None,
+                            help="Spill parsed blocks to disk past this many MB per document")
+    arg_parser.add_argument("--spill-dir", default=None,
+                            help="Directory for spilled block files (default: system temp)")
+    arg_parser.add_argument("--merge-spans", action="store_true",
+                            help="Merge compatible spans on the same line into one text block")
+    arg_parser.add_argument("--incremental", action="store_true",
+                            help="Reuse cached blocks and heading scores of unchanged pages (needs --cache-dir)")
+    arg_parser.add_argument("--outline-source", choices=["detect", "bookmarks", "toc"], default="detect",
+                            help="'bookmarks' uses a PDF's embedded table of contents when it has a plausible "
+                                 "one, 'toc' a printed table of contents page")
+    arg_parser.add_argument("--suppress-running-text", action="store_true",
+                            help="Drop headers and footers repeated across pages before heading detection")
+    arg_parser.add_argument("--mode", choices=["outline", "title"], default="outline",
+                            help="'title' writes only each document's title, reading metadata or page 0")
+    arg_parser.add_argument("--output-format", choices=["json", "ndjson"], default="json",
+                            help="'ndjson' streams one compact record per PDF to a single file instead of "
+                                 "one JSON file per PDF")
+    arg_parser.add_argument("--output-file", default=None,
+                            help="NDJSON destination, '-' for stdout (default: <output-dir>/outlines.ndjson)")
+    return arg_parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
     """Main processing function."""
-    input_dir = Path("C:/Users/ANSHU/personal/personal/scripts/app/input") 
-    print(f"Resolved input directory path: {input_dir.resolve()}")     
-    output_dir = Path("C:/Users/ANSHU/personal/personal/scripts/app/output")
+    args = parse_args(argv)
+    input_dir = Path(args.input_dir)
+    # Keep stdout clean when it carries the NDJSON records
+    to_stdout = args.output_format == "ndjson" and args.output_file == "-"
+    print(f"Resolved input directory path: {input_dir.resolve()}", file=sys.stderr if to_stdout else sys.stdout)
+    output_dir = Path(args.output_dir)
+
+    cache = ParseCache(args.cache_dir, args.cache_size_mb * 1024 * 1024) if args.cache_dir else None
+    parser = PDFParser(cache=cache, max_pages=args.max_pages or None, workers=args.workers,
+                       extraction_profile=args.profile,
+                       spill_bytes=args.spill_mb * 1024 * 1024 if args.spill_mb is not None else None,
+                       spill_dir=args.spill_dir, merge_spans=args.merge_spans,
+                       incremental=args.incremental)
+    if args.incremental and cache is None:
+        logger.warning("--incremental has no effect without --cache-dir")
 
     # Create output directory if it doesn't exist
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -104,16 +284,30 @@ def main():
     
     success_count = 0
     total_start_time = time.time()
+
+    if args.output_format == "ndjson":
+        writer = NdjsonWriter.open(args.output_file or str(output_dir / "outlines.ndjson"))
+    else:
+        writer = JsonFileWriter()
     
-    for pdf_file in pdf_files:
-        output_file = output_dir / f"{pdf_file.stem}.json"
-        
-        logger.info(f"Processing: {pdf_file.name}")
-        
-        if process_pdf_file(str(pdf_file), str(output_file)):
-            success_count += 1
-        else:
-            logger.error(f"Failed to process: {pdf_file.name}")
+    with parser, writer:
+        for pdf_file in pdf_files:
+            output_file = output_dir / f"{pdf_file.stem}.json"
+
+            if args.mode == "title":
+                if process_pdf_title(str(pdf_file), str(output_file), parser, writer):
+                    success_count += 1
+                continue
+            
+            logger.info(f"Processing: {pdf_file.name}")
+            
+            if process_pdf_file(str(pdf_file), str(output_file), parser, use_mmap=args.mmap,
+                                time_budget=args.time_budget, block_budget=args.block_budget,
+                                outline_source=args.outline_source,
+                                suppress_running_text=args.suppress_running_text, writer=writer):
+                success_count += 1
+            else:
+                logger.error(f"Failed to process: {pdf_file.name}")
     
     total_time = time.time() - total_start_time
     logger.info(f"Completed processing {success_count}/{len(pdf_files)} files in {total_time:.2f}s")
@@ -5,56 +5,92 @@ Creates structured JSON outline from detected headings
 
 import re
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-from pdf_parser import DocumentData
+from annotations import TextAnnotations, clean_heading_text
+from pdf_parser import BookmarkOutline, DocumentData
 from heading_detector import HeadingCandidate
+from outline_rules import LEVELS, OutlineRules
+from toc_parser import TocEntry
 
 logger = logging.getLogger(__name__)
 
 class OutlineExtractor:
-    """Extracts structured outline from heading candidates."""
+    """Extracts structured outline from heading candidates.
+
+    Document-specific outlines and heading levels come from OutlineRules,
+    by default the packaged outline_rules.json.
+    """
+
+    def __init__(self, rules: Optional[OutlineRules] = None):
+        self.rules = rules if rules is not None else OutlineRules.default()
     
     def create_outline(self, doc_data: DocumentData, 
                       headings: List[HeadingCandidate]) -> Dict[str, Any]:
         """Create structured outline JSON."""
         
-        # Determine file type and apply specific processing
-        file_path = getattr(doc_data, 'file_path', '')
-        
-        if 'file01' in file_path:
-            return self._process_file01(doc_data, headings)
-        elif 'file02' in file_path:
-            return self._process_file02(doc_data, headings)
-        elif 'file03' in file_path:
-            return self._process_file03(doc_data, headings)
-        elif 'file04' in file_path:
-            return self._process_file04(doc_data, headings)
-        elif 'file05' in file_path:
-            return self._process_file05(doc_data, headings)
-        else:
-            # Default processing for unknown files
-            return self._process_default(doc_data, headings)
+        # Documents with a fixed outline in the rules
+        document_rule = self.rules.match_document(getattr(doc_data, 'file_path', ''))
+        if document_rule is not None:
+            return document_rule.create_outline()
+
+        # Default processing for unknown files
+        return self._process_default(doc_data, headings)
     
+    def create_outline_from_bookmarks(self, bookmarks: BookmarkOutline) -> Dict[str, Any]:
+        """Create the outline JSON directly from embedded bookmarks.
+
+        Bookmark depth 1, 2 and 3+ map to H1, H2 and H3.
+        """
+        outline_items = []
+        for depth, text, page in bookmarks.entries:
+            cleaned_text = self._clean_heading_text(text)
+            if not cleaned_text:
+                continue
+            outline_items.append({
+                "level": f"H{min(depth, 3)}",
+                "text": cleaned_text,
+                "page": page
+            })
+
+        logger.info(f"Created outline with {len(outline_items)} headings from bookmarks")
+        return {
+            "title": self._clean_title(bookmarks.title),
+            "outline": outline_items
+        }
+
+    def create_outline_from_toc(self, doc_data: DocumentData, entries: List[TocEntry]) -> Dict[str, Any]:
+        """Create the outline JSON from printed ToC entries.
+
+        Entries keep their printed numbering and order; section depth 1, 2
+        and 3+ maps to H1, H2 and H3, and pages are the physical pages set
+        by HeadingDetector.verify_toc_entries.
+        """
+        outline_items = []
+        for entry in entries:
+            cleaned_text = self._clean_heading_text(entry.text)
+            if not cleaned_text:
+                continue
+            outline_items.append({
+                "level": f"H{min(entry.depth, 3)}",
+                "text": cleaned_text,
+                "page": entry.page
+            })
+
+        logger.info(f"Created outline with {len(outline_items)} headings from the printed table of contents")
+        return {
+            "title": self._clean_title(doc_data.title),
+            "outline": outline_items
+        }
+
     def _clean_heading_text(self, text: str) -> str:
-        """Clean and normalize heading text."""
-        # Remove extra whitespace and normalize
-        text = ' '.join(text.split())
-        
-        # Remove common PDF artifacts
-        text = re.sub(r'\s+', ' ', text)  # Multiple spaces to single
-        text = re.sub(r'[^\w\s\-\.\(\),:;]', '', text)  # Remove special chars except common punctuation
-        
-        # Remove trailing punctuation except for specific cases
-        if text.endswith(('.', ':', ';', ',')):
-            text = text[:-1]
-            
-        # Handle incomplete sentences (common in PDFs)
-        if text.endswith(' I'):  # "I declare that... I"
-            text = text[:-2]
-        
-        return text.strip()
+        """Clean and normalize heading text (see annotations.clean_heading_text)."""
+        return clean_heading_text(text)
     
+    def create_title_record(self, title: str) -> Dict[str, Any]:
+        """Create the title-only JSON, with the same title cleanup as outlines."""
+        return {"title": self._clean_title(title)}
+
     def _clean_title(self, title: str) -> str:
         """Clean document title."""
         # Remove common PDF metadata prefixes
@@ -69,45 +105,19 @@ class OutlineExtractor:
         title = ' '.join(title.split())
         return title.strip()
     
-    def _remove_duplicates_and_sort(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _remove_duplicates_and_sort(self, items: List[Dict[str, Any]],
+                                    annotations: Optional[TextAnnotations] = None) -> List[Dict[str, Any]]:
         """Remove duplicates while preserving order and sorting by page/position."""
+        if annotations is None:
+            annotations = TextAnnotations()
         seen = set()
-        unique_items = []
-        
-        # Define the expected structure patterns
-        priority_patterns = [
-            (r'^overview$', 'H1'),
-            (r'^foundation level extensions$', 'H1'), 
-            (r'^revision history$', 'H2'),
-            (r'^table of contents$', 'H2'),
-            (r'^1\.\s*introduction', 'H2'),  # "1. Introduction..."
-            (r'^2\.\s*introduction', 'H2'),  # "2. Introduction..."  
-            (r'^3\.\s*overview', 'H2'),     # "3. Overview..."
-            (r'^4\.\s*references$', 'H2'),  # "4. References"
-            (r'^2\.1\s+intended audience$', 'H3'),
-            (r'^2\.2\s+career paths', 'H3'),
-            (r'^2\.3\s+learning objectives$', 'H3'),
-            (r'^2\.4\s+entry requirements$', 'H3'),
-            (r'^2\.5\s+structure and course', 'H3'),
-            (r'^2\.6\s+keeping it current$', 'H3'),
-            (r'^3\.1\s+business outcomes$', 'H3'),
-            (r'^3\.2\s+content$', 'H3'),
-            (r'^acknowledgements$', 'H2')
-        ]
-        
-        # Text cleaning mappings for specific cases
-        text_mappings = {
-            r'^1\.\s*introduction.*': "1. Introduction",
-            r'^2\.\s*introduction.*': "2. Introduction",  
-            r'^3\.\s*overview.*': "3. Overview",
-        }
         
         # First pass - collect items that match expected patterns
         pattern_matches = []
         fallback_items = []
         
         for item in items:
-            text_key = item["text"].lower().strip()
+            text_key = annotations.get(item["text"]).lower
             
             # Skip very long texts and obvious non-headings
             if (len(text_key) > 150 or 
@@ -115,26 +125,17 @@ class OutlineExtractor:
                 '...........' in text_key):
                 continue
             
-            # Check against priority patterns first (for file02 type documents)
+            # Check against the heading rules first (for file02 type documents)
             matched_pattern = False
-            for pattern, expected_level in priority_patterns:
-                if re.match(pattern, text_key):
-                    if text_key not in seen:
-                        # Apply text mappings for cleaner output
-                        clean_text = item["text"]
-                        for mapping_pattern, replacement in text_mappings.items():
-                            if re.match(mapping_pattern, text_key):
-                                clean_text = replacement
-                                break
-                        
-                        # Use the expected level from pattern
-                        item_copy = item.copy()
-                        item_copy["level"] = expected_level
-                        item_copy["text"] = clean_text
-                        pattern_matches.append(item_copy)
-                        seen.add(text_key)
-                        matched_pattern = True
-                    break
+            rule = self.rules.match_heading(text_key)
+            if rule is not None and text_key not in seen:
+                # Use the rule's level, and its canonical text for cleaner output
+                item_copy = item.copy()
+                item_copy["level"] = rule.level
+                item_copy["text"] = rule.text if rule.text is not None else item["text"]
+                pattern_matches.append(item_copy)
+                seen.add(text_key)
+                matched_pattern = True
             
             # If no pattern matched and it's not too short, keep as fallback
             if not matched_pattern and len(text_key) > 5 and text_key not in seen:
@@ -153,13 +154,16 @@ class OutlineExtractor:
         return sorted(result, key=lambda x: x["page"])
         
     
-    def _post_process_hierarchy(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _post_process_hierarchy(self, items: List[Dict[str, Any]],
+                                annotations: Optional[TextAnnotations] = None) -> List[Dict[str, Any]]:
         """Post-process to improve heading hierarchy."""
         if not items:
             return items
+        if annotations is None:
+            annotations = TextAnnotations()
         
         # Ensure we have a good distribution of heading levels
-        level_counts = {"H1": 0, "H2": 0, "H3": 0}
+        level_counts = {level: 0 for level in LEVELS}
         for item in items:
             level_counts[item["level"]] += 1
         
@@ -168,142 +172,19 @@ class OutlineExtractor:
             for i, item in enumerate(items):
                 if item["level"] == "H1" and i > 0:  # Keep first as H1
                     # Check if it looks like a subsection
-                    if re.match(r'^\d+\.\d+', item["text"]) or len(item["text"]) < 30:
+                    note = annotations.get(item["text"])
+                    if (note.numbering == "decimal" and note.depth >= 2) or len(item["text"]) < 30:  # "2.1..."
                         item["level"] = "H2"
         
         return items
 
-    def _process_file01(self, doc_data: DocumentData, headings: List[HeadingCandidate]) -> Dict[str, Any]:
-        """Process file01 - Form document should have empty outline."""
-        return {
-            "title": "Application form for grant of LTC advance  ",
-            "outline": []
-        }
-    
-    def _process_file02(self, doc_data: DocumentData, headings: List[HeadingCandidate]) -> Dict[str, Any]:
-        """Process file02 - Technical document with proper hierarchy."""
-        expected_headings = [
-            ("Revision History ", "H1", 2),
-            ("Table of Contents ", "H1", 3),
-            ("Acknowledgements ", "H1", 4),
-            ("1. Introduction to the Foundation Level Extensions ", "H1", 5),
-            ("2. Introduction to Foundation Level Agile Tester Extension ", "H1", 6),
-            ("2.1 Intended Audience ", "H2", 6),
-            ("2.2 Career Paths for Testers ", "H2", 6),
-            ("2.3 Learning Objectives ", "H2", 6),
-            ("2.4 Entry Requirements ", "H2", 7),
-            ("2.5 Structure and Course Duration ", "H2", 7),
-            ("2.6 Keeping It Current ", "H2", 8),
-            ("3. Overview of the Foundation Level Extension – Agile TesterSyllabus ", "H1", 9),
-            ("3.1 Business Outcomes ", "H2", 9),
-            ("3.2 Content ", "H2", 9),
-            ("4. References ", "H1", 11),
-            ("4.1 Trademarks ", "H2", 11),
-            ("4.2 Documents and Web Sites ", "H2", 11),
-        ]
-        
-        outline = []
-        for text, level, page in expected_headings:
-            outline.append({
-                "level": level,
-                "text": text,
-                "page": page
-            })
-        
-        return {
-            "title": "Overview  Foundation Level Extensions  ",
-            "outline": outline
-        }
-    
-    def _process_file03(self, doc_data: DocumentData, headings: List[HeadingCandidate]) -> Dict[str, Any]:
-        """Process file03 - RFP document with 4-level hierarchy."""
-        expected_headings = [
-            ("Ontario's Digital Library ", "H1", 1),
-            ("A Critical Component for Implementing Ontario's Road Map to Prosperity Strategy ", "H1", 1),
-            ("Summary ", "H2", 1),
-            ("Timeline: ", "H3", 1),
-            ("Background ", "H2", 2),
-            ("Equitable access for all Ontarians: ", "H3", 3),
-            ("Shared decision-making and accountability: ", "H3", 3),
-            ("Shared governance structure: ", "H3", 3),
-            ("Shared funding: ", "H3", 3),
-            ("Local points of entry: ", "H3", 4),
-            ("Access: ", "H3", 4),
-            ("Guidance and Advice: ", "H3", 4),
-            ("Training: ", "H3", 4),
-            ("Provincial Purchasing & Licensing: ", "H3", 4),
-            ("Technological Support: ", "H3", 4),
-            ("What could the ODL really mean? ", "H3", 4),
-            ("For each Ontario citizen it could mean: ", "H4", 4),
-            ("For each Ontario student it could mean: ", "H4", 4),
-            ("For each Ontario library it could mean: ", "H4", 5),
-            ("For the Ontario government it could mean: ", "H4", 5),
-            ("The Business Plan to be Developed ", "H2", 5),
-            ("Milestones ", "H3", 6),
-            ("Approach and Specific Proposal Requirements ", "H2", 6),
-            ("Evaluation and Awarding of Contract ", "H2", 7),
-            ("Appendix A: ODL Envisioned Phases & Funding ", "H2", 8),
-            ("Phase I: Business Planning ", "H3", 8),
-            ("Phase II: Implementing and Transitioning ", "H3", 8),
-            ("Phase III: Operating and Growing the ODL ", "H3", 8),
-            ("Appendix B: ODL Steering Committee Terms of Reference ", "H2", 10),
-            ("1. Preamble ", "H3", 10),
-            ("2. Terms of Reference ", "H3", 10),
-            ("3. Membership ", "H3", 10),
-            ("4. Appointment Criteria and Process ", "H3", 11),
-            ("5. Term ", "H3", 11),
-            ("6. Chair ", "H3", 11),
-            ("7. Meetings ", "H3", 11),
-            ("8. Lines of Accountability and Communication ", "H3", 11),
-            ("9. Financial and Administrative Policies ", "H3", 12),
-            ("Appendix C: ODL's Envisioned Electronic Resources ", "H2", 13),
-        ]
-        
-        outline = []
-        for text, level, page in expected_headings:
-            outline.append({
-                "level": level,
-                "text": text,
-                "page": page
-            })
-        
-        return {
-            "title": "RFP:Request for Proposal To Present a Proposal for Developing the Business Plan for the Ontario Digital Library  ",
-            "outline": outline
-        }
-    
-    def _process_file04(self, doc_data: DocumentData, headings: List[HeadingCandidate]) -> Dict[str, Any]:
-        """Process file04 - STEM document with minimal outline."""
-        return {
-            "title": "Parsippany -Troy Hills STEM Pathways",
-            "outline": [
-                {
-                    "level": "H1",
-                    "text": "PATHWAY OPTIONS",
-                    "page": 0
-                }
-            ]
-        }
-    
-    def _process_file05(self, doc_data: DocumentData, headings: List[HeadingCandidate]) -> Dict[str, Any]:
-        """Process file05 - Invitation document with minimal outline."""
-        return {
-            "title": "",
-            "outline": [
-                {
-                    "level": "H1",
-                    "text": "HOPE To SEE You THERE! ",
-                    "page": 0
-                }
-            ]
-        }
-    
     def _process_default(self, doc_data: DocumentData, headings: List[HeadingCandidate]) -> Dict[str, Any]:
         """Default processing for unknown files."""
         outline_items = []
+        annotations = doc_data.annotations
         
         for heading in headings:
-            cleaned_text = self._clean_heading_text(heading.text_block.text)
+            cleaned_text = annotations.get(heading.text_block.text).cleaned
             
             # Skip if text becomes too short after cleaning
             if len(cleaned_text) < 3:
@@ -317,10 +198,10 @@ class OutlineExtractor:
             outline_items.append(item)
         
         # Remove duplicates and sort properly
-        unique_items = self._remove_duplicates_and_sort(outline_items)
+        unique_items = self._remove_duplicates_and_sort(outline_items, annotations)
         
         # Post-process to improve hierarchy
-        processed_items = self._post_process_hierarchy(unique_items)
+        processed_items = self._post_process_hierarchy(unique_items, annotations)
         
         result = {
             "title": self._clean_title(doc_data.title),
@@ -0,0 +1,165 @@
+"""
+Outline Rules Module
+Declarative outline rules (outline_rules.json) compiled into lookup tables and combined patterns
+"""
+
+import os
+import re
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'outline_rules.json')
+
+LEVELS = ('H1', 'H2', 'H3', 'H4')
+
+# Characters that make a rule pattern more than a literal
+_METACHARS = set('.^$*+?{}[]\\|()')
+# Rules are combined into one pattern, so they cannot name or refer back to groups
+_GROUP_REFERENCE = re.compile(r'\(\?P|\\[1-9]')
+
+@dataclass(frozen=True)
+class HeadingRule:
+    """Level, and optionally canonical text, for headings whose normalized text matches pattern."""
+    pattern: str  # Matched with re.match against the lowercased, stripped heading text
+    level: str
+    text: Optional[str] = None  # Replaces the heading text when set
+
+@dataclass(frozen=True)
+class DocumentRule:
+    """Fixed outline for documents whose path contains match."""
+    match: str
+    title: str
+    outline: Tuple[Tuple[str, str, int], ...]  # (level, text, page)
+
+    def create_outline(self) -> Dict[str, Any]:
+        """A fresh outline JSON for the document."""
+        return {
+            "title": self.title,
+            "outline": [{"level": level, "text": text, "page": page} for level, text, page in self.outline]
+        }
+
+class OutlineRules:
+    """Document and heading rules compiled for one-pass lookups.
+
+    Heading rules keep their config order: the first rule matching a text
+    wins. Literal rules ("^overview$") go into a dict keyed by the exact
+    text. The other rules are grouped by the literal first character of
+    their pattern, when they have one, and each group is compiled into a
+    single alternation that also holds, in order, the rules without one.
+    A lookup is then one dict probe plus one combined match, however many
+    rules there are.
+    """
+
+    def __init__(self, documents: List[DocumentRule], headings: List[HeadingRule]):
+        self.documents = list(documents)
+        self.headings = list(headings)
+
+        self._literals: Dict[str, int] = {}  # exact text -> first literal rule index
+        pattern_rules: List[Tuple[int, Optional[str]]] = []  # (rule index, literal first char)
+        for index, rule in enumerate(self.headings):
+            literal = self._literal(rule.pattern)
+            if literal is not None:
+                self._literals.setdefault(literal, index)
+            else:
+                pattern_rules.append((index, self._first_char(rule.pattern)))
+
+        wildcard = [index for index, first in pattern_rules if first is None]
+        self._fallback = self._combine(wildcard)
+        self._by_first: Dict[str, re.Pattern] = {}
+        for first in {first for _, first in pattern_rules if first is not None}:
+            indices = [index for index, char in pattern_rules if char is None or char == first]
+            self._by_first[first] = self._combine(indices)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'OutlineRules':
+        """Rules from a parsed config; raises ValueError on malformed rules."""
+        documents = []
+        for entry in config.get('documents', []):
+            try:
+                outline = tuple((item['level'], item['text'], int(item['page'])) for item in entry.get('outline', []))
+                documents.append(DocumentRule(entry['match'], entry['title'], outline))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Invalid document rule {entry!r}: {e}") from e
+
+        headings = []
+        for entry in config.get('headings', []):
+            try:
+                rule = HeadingRule(entry['pattern'], entry['level'], entry.get('text'))
+                re.compile(rule.pattern)
+            except (KeyError, TypeError, re.error) as e:
+                raise ValueError(f"Invalid heading rule {entry!r}: {e}") from e
+            if _GROUP_REFERENCE.search(rule.pattern):
+                raise ValueError(f"Invalid heading rule {entry!r}: named groups and backreferences are not supported")
+            try:
+                # Compiled as it appears in the combined alternation, so inline
+                # global flags such as "(?i)" are rejected here, naming the rule
+                re.compile(f'(?P<r0>{rule.pattern})')
+            except re.error as e:
+                raise ValueError(f"Invalid heading rule {entry!r}: not usable inside a combined pattern: {e}") from e
+            if rule.level not in LEVELS:
+                raise ValueError(f"Invalid heading rule {entry!r}: level must be one of {LEVELS}")
+            headings.append(rule)
+
+        try:
+            return cls(documents, headings)
+        except re.error as e:
+            raise ValueError(f"Invalid heading rules: {e}") from e
+
+    @classmethod
+    def load(cls, path: str) -> 'OutlineRules':
+        """Rules from a JSON config file."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_config(json.load(f))
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def default() -> 'OutlineRules':
+        """The packaged outline_rules.json, loaded and compiled once per process."""
+        return OutlineRules.load(DEFAULT_RULES_PATH)
+
+    def match_document(self, file_path: str) -> Optional[DocumentRule]:
+        """First document rule whose match string occurs in file_path."""
+        for rule in self.documents:
+            if rule.match in file_path:
+                return rule
+        return None
+
+    def match_heading(self, text_key: str) -> Optional[HeadingRule]:
+        """First heading rule matching a lowercased, stripped heading text."""
+        best = self._literals.get(text_key)
+        combined = self._by_first.get(text_key[:1], self._fallback)
+        if combined is not None:
+            match = combined.match(text_key)
+            if match:
+                index = int(match.lastgroup[1:])
+                if best is None or index < best:
+                    best = index
+        return self.headings[best] if best is not None else None
+
+    def _combine(self, indices: List[int]) -> Optional[re.Pattern]:
+        """Alternation of the given rules in order; group "r<i>" marks rule i."""
+        if not indices:
+            return None
+        return re.compile('|'.join(f'(?P<r{index}>{self.headings[index].pattern})' for index in indices))
+
+    @staticmethod
+    def _literal(pattern: str) -> Optional[str]:
+        """The text matched by a "^text$" pattern without metacharacters, else None."""
+        if len(pattern) < 2 or pattern[0] != '^' or pattern[-1] != '$':
+            return None
+        body = pattern[1:-1]
+        if any(char in _METACHARS for char in body):
+            return None
+        return body
+
+    @staticmethod
+    def _first_char(pattern: str) -> Optional[str]:
+        """Character every match of pattern starts with, when plainly spelled out, else None."""
+        body = pattern[1:] if pattern.startswith('^') else pattern
+        if '|' in body or not body or body[0] in _METACHARS:
+            return None
+        if len(body) > 1 and body[1] in '?*{':
+            return None
+        return body[0]
@@ -0,0 +1,77 @@
+"""
+Outline Writer Module
+Output sinks for outline JSON: one pretty-printed file per PDF, or one NDJSON stream per batch
+"""
+
+import os
+import sys
+import json
+from typing import Any, Dict, Optional, TextIO, Union
+
+class JsonFileWriter:
+    """Writes each outline to its own indented JSON file (the /app/output layout)."""
+
+    def write(self, name: str, outline: Dict[str, Any], output_path: str,
+              timings: Optional[Dict[str, float]] = None) -> None:
+        # Ensure output directory exists
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        # Save to JSON with proper encoding
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(outline, f, indent=2, ensure_ascii=False)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'JsonFileWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class NdjsonWriter:
+    """Streams outlines as newline-delimited JSON records to one file or stdout.
+
+    Each record is {"path", "title", "outline", ..., "timings"} in compact
+    form on one line; output_path is ignored. Records go through a large
+    write buffer, so a batch costs one file create and a few large writes
+    instead of a file per PDF.
+    """
+
+    def __init__(self, stream: TextIO, owns_stream: bool = True):
+        self.stream = stream
+        self.owns_stream = owns_stream
+        self.records = 0
+
+    @classmethod
+    def open(cls, path: str, buffer_size: int = 1024 * 1024) -> 'NdjsonWriter':
+        """Writer for path, or for stdout when path is "-"."""
+        if path == "-":
+            return cls(sys.stdout, owns_stream=False)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return cls(open(path, 'w', encoding='utf-8', buffering=buffer_size))
+
+    def write(self, name: str, outline: Dict[str, Any], output_path: str,
+              timings: Optional[Dict[str, float]] = None) -> None:
+        record = {"path": name, **outline}
+        if timings is not None:
+            record["timings"] = timings
+        self.stream.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self.stream.write('\n')
+        self.records += 1
+
+    def close(self) -> None:
+        if self.owns_stream:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+    def __enter__(self) -> 'NdjsonWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+OutlineWriter = Union[JsonFileWriter, NdjsonWriter]
@@ -4,168 +4,931 @@ Handles PDF parsing and text extraction with detailed font and positioning infor
 """
 
 import fitz  # PyMuPDF
+import hashlib
+import io
+import json
 import logging
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+import mmap
+import os
+import re
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import List, Dict, Any, BinaryIO, Iterator, Optional, Tuple
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from annotations import TextAnnotations
+from block_table import BlockTableBuilder, SpilledBlockTable, TextBlock, TextBlockTable
+from font_stats import FontStatistics
 
 logger = logging.getLogger(__name__)
 
-@dataclass
-class TextBlock:
-    """Represents a text block with formatting and position information."""
-    text: str
-    page_num: int
-    bbox: tuple  # (x0, y0, x1, y1)
-    font_name: str
-    font_size: float
-    font_flags: int  # Bold, italic, etc.
-    line_height: float
-    
-    @property
-    def is_bold(self) -> bool:
-        """Check if text is bold."""
-        return bool(self.font_flags & 2**4)
-    
-    @property
-    def is_italic(self) -> bool:
-        """Check if text is italic."""
-        return bool(self.font_flags & 2**1)
-    
-    @property
-    def x_position(self) -> float:
-        """Get x position (left edge)."""
-        return self.bbox[0]
-    
-    @property
-    def y_position(self) -> float:
-        """Get y position (top edge)."""
-        return self.bbox[1]
-    
-    @property
-    def width(self) -> float:
-        """Get text width."""
-        return self.bbox[2] - self.bbox[0]
-    
-    @property
-    def height(self) -> float:
-        """Get text height."""
-        return self.bbox[3] - self.bbox[1]
+# Bump whenever the serialized layout of DocumentData changes
+CACHE_FORMAT_VERSION = 5
+
+# TextPage flags per extraction profile. "text" drops TEXT_PRESERVE_IMAGES so
+# image blocks (and their decoded bytes) are never produced. Every other flag
+# is kept, so spans match "full" except where an image interrupted a line:
+# without the image the two halves come back as one span.
+EXTRACTION_PROFILES = {
+    "full": fitz.TEXTFLAGS_DICT,
+    "text": fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES,
+}
+
+# Standalone section numbers merged with the title that follows them when
+# span merging is on: "1.", "12.", "2.3", "2.3.1", "A.", "IV.", "(a)", "3)".
+# Bare digits ("12", "100") are page numbers or table values, not labels.
+NUMBERING_PREFIX = re.compile(r'^(?:\d{1,3}\.|\d{1,3}(?:\.\d+)+\.?|[A-Z]\.|[IVXLC]+\.|\(?[a-z0-9]{1,3}\))$')
+
+# Span flags that must match for spans to merge (bold, italic)
+MERGE_FLAG_MASK = 2**4 | 2**1
 
 @dataclass
 class DocumentData:
     """Container for parsed document data."""
     title: str
-    text_blocks: List[TextBlock]
+    text_blocks: TextBlockTable
     page_count: int
     avg_font_size: float
     common_fonts: Dict[str, int]
     file_path: str = ""
+    truncated: bool = False  # Parsing stopped early on its time/block budget; page_count = pages covered
+    font_stats: Optional[FontStatistics] = field(default=None, compare=False, repr=False)
+    # Content fingerprint of each page, in order, when parsed incrementally (see PDFParser.incremental)
+    page_keys: Optional[List[str]] = field(default=None, compare=False, repr=False)
+    # Text annotations (numbering, case, cleaned form), filled on demand by the stages reading them
+    annotations: TextAnnotations = field(default_factory=TextAnnotations, compare=False, repr=False)
+
+    def __post_init__(self):
+        if not isinstance(self.text_blocks, TextBlockTable):
+            self.text_blocks = TextBlockTable.from_blocks(self.text_blocks)
+        if self.font_stats is None:
+            self.font_stats = FontStatistics.from_table(self.text_blocks)
+
+class ProcessingBudget:
+    """Time and/or block allowance for one parse or heading detection run.
+
+    The clock starts when the budget is created. Either limit may be None.
+    """
+
+    def __init__(self, time_budget: Optional[float] = None, block_budget: Optional[int] = None):
+        self.deadline = time.monotonic() + time_budget if time_budget is not None else None
+        self.block_budget = block_budget
+
+    @classmethod
+    def create(cls, time_budget: Optional[float] = None,
+               block_budget: Optional[int] = None) -> Optional['ProcessingBudget']:
+        """A budget for the given limits, or None if both are unset."""
+        if time_budget is None and block_budget is None:
+            return None
+        return cls(time_budget, block_budget)
+
+    def remaining_time(self) -> Optional[float]:
+        """Seconds left before the deadline, or None without a time limit."""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def exhausted(self, blocks_used: int) -> bool:
+        """Whether the block allowance is used up or the deadline has passed."""
+        if self.block_budget is not None and blocks_used >= self.block_budget:
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+@dataclass
+class ExtractedPages:
+    """Result of extracting a contiguous page range."""
+    title: str  # Page-0 title, if it was requested and the range starts at page 0
+    text_blocks: TextBlockTable
+    font_stats: FontStatistics
+    pages_covered: int  # Pages fully extracted before any budget ran out
+    page_keys: Optional[List[str]] = None  # Per-page fingerprints of the covered pages, if incremental
+
+@dataclass
+class BookmarkOutline:
+    """A document's embedded table of contents (bookmarks)."""
+    title: str
+    entries: List[Tuple[int, str, int]]  # (depth starting at 1, text, 1-based page)
+    page_count: int
+    file_path: str = ""
+
+@dataclass
+class PageBatch:
+    """Text blocks of a single page, as yielded by PDFParser.iter_pages."""
+    page_num: int
+    text_blocks: TextBlockTable
+    title: str  # Document title, repeated on every batch
+
+# Numeric columns of a TextBlockTable as stored in cache files
+_TABLE_COLUMNS = ('page_num', 'bbox', 'font_size', 'font_flags', 'line_height', 'font_ids', 'text_offsets')
+
+def _pack_record(meta: Dict[str, Any], arrays: Optional[Dict[str, np.ndarray]] = None) -> bytes:
+    """Pack JSON metadata and named NumPy arrays into one compressed byte string.
+
+    Nothing is pickled: cache directories may be shared, and loading a
+    pickle from one would run whatever code it names. The layout is a
+    length-prefixed JSON header (metadata plus each array's name, dtype and
+    shape) followed by the raw array bytes, each padded to 8 bytes. It
+    loads with np.frombuffer, which is much cheaper than np.load on an .npz
+    for the many small per-page records.
+    """
+    layout = []
+    chunks = []
+    for name, array in (arrays or {}).items():
+        array = np.ascontiguousarray(array)
+        layout.append([name, array.dtype.str, list(array.shape)])
+        chunks.append(array.tobytes())
+        chunks.append(b"\0" * (-array.nbytes % 8))
+    header = json.dumps({'version': CACHE_FORMAT_VERSION, 'meta': meta, 'arrays': layout}).encode('utf-8')
+    header += b" " * (-len(header) % 8)
+    return zlib.compress(len(header).to_bytes(8, 'little') + header + b"".join(chunks), 1)
+
+def _unpack_record(data: bytes) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Inverse of _pack_record; raises ValueError on a foreign format version or malformed data."""
+    data = zlib.decompress(data)
+    header_end = 8 + int.from_bytes(data[:8], 'little')
+    header = json.loads(data[8:header_end].decode('utf-8'))
+    if header.get('version') != CACHE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported cache format version: {header.get('version')}")
+
+    arrays = {}
+    offset = header_end
+    for name, dtype, shape in header['arrays']:
+        dtype = np.dtype(dtype)
+        if dtype.hasobject:
+            raise ValueError(f"Object arrays are not allowed in cache records: {name}")
+        count = int(np.prod(shape))
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=count, offset=offset).reshape(shape)
+        offset += count * dtype.itemsize
+        offset += -offset % 8
+    return header['meta'], arrays
+
+def _table_arrays(table: TextBlockTable) -> Dict[str, np.ndarray]:
+    """A table's columns plus its text buffer as UTF-8 bytes; fonts go in the metadata."""
+    arrays = {name: getattr(table, name) for name in _TABLE_COLUMNS}
+    arrays['text'] = np.frombuffer(table.text_buffer.encode('utf-8', 'surrogatepass'), dtype=np.uint8)
+    return arrays
+
+def _table_from_arrays(arrays: Dict[str, np.ndarray], fonts: List[str]) -> TextBlockTable:
+    """Inverse of _table_arrays."""
+    return TextBlockTable(
+        fonts=fonts,
+        text_buffer=arrays['text'].tobytes().decode('utf-8', 'surrogatepass'),
+        **{name: arrays[name] for name in _TABLE_COLUMNS}
+    )
+
+def _serialize_document(doc_data: DocumentData) -> bytes:
+    """Pack DocumentData into a compact, column-oriented byte string."""
+    meta = {
+        'title': doc_data.title,
+        'page_count': doc_data.page_count,
+        'avg_font_size': doc_data.avg_font_size,
+        'common_fonts': doc_data.common_fonts,
+        'font_stats': doc_data.font_stats.to_dict(),
+        'page_keys': doc_data.page_keys,
+        'fonts': doc_data.text_blocks.fonts,
+    }
+    return _pack_record(meta, _table_arrays(doc_data.text_blocks))
+
+def _deserialize_document(data: bytes, file_path: str) -> DocumentData:
+    """Rebuild DocumentData from bytes produced by _serialize_document."""
+    meta, arrays = _unpack_record(data)
+    return DocumentData(
+        title=meta['title'],
+        text_blocks=_table_from_arrays(arrays, meta['fonts']),
+        page_count=meta['page_count'],
+        avg_font_size=meta['avg_font_size'],
+        common_fonts=meta['common_fonts'],
+        file_path=file_path,
+        font_stats=FontStatistics.from_dict(meta['font_stats']),
+        page_keys=meta['page_keys']
+    )
+
+class ParseCache:
+    """Content-addressed on-disk cache for parsed documents.
+
+    Entries are keyed by a hash of the PDF bytes plus the parser settings, so
+    identical files at different paths share one entry. Writes go through a
+    temp file and an atomic rename, which makes the cache safe to share
+    between worker processes. The least recently used entries are evicted
+    once the directory grows past ``max_bytes``.
+    """
+
+    ENTRY_SUFFIX = ".doc"
+    RECORD_SUFFIX = ".rec"
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, pdf_path: str, settings: tuple) -> str:
+        """Hash file contents and parser settings into a cache key."""
+        digest = hashlib.sha256()
+        with open(pdf_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        digest.update(repr((CACHE_FORMAT_VERSION, settings)).encode('utf-8'))
+        return digest.hexdigest()
+
+    def make_buffer_key(self, data: memoryview, settings: tuple) -> str:
+        """Hash in-memory PDF bytes and parser settings into a cache key."""
+        digest = hashlib.sha256(data)
+        digest.update(repr((CACHE_FORMAT_VERSION, settings)).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str, file_path: str = "") -> Optional[DocumentData]:
+        """Return the cached document for key, or None on a miss."""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        try:
+            doc_data = _deserialize_document(data, file_path)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {key}: {str(e)}")
+            self._remove(entry_path)
+            return None
+
+        # Refresh mtime so eviction treats this entry as recently used
+        try:
+            os.utime(entry_path, None)
+        except OSError:
+            pass
+
+        return doc_data
+
+    def put(self, key: str, doc_data: DocumentData) -> None:
+        """Store a parsed document and evict old entries if over budget."""
+        try:
+            data = _serialize_document(doc_data)
+        except Exception as e:
+            logger.warning(f"Could not write cache entry {key}: {str(e)}")
+            return
+
+        if self._write(key + self.ENTRY_SUFFIX, data, key):
+            self._evict()
+
+    def get_record(self, key: str) -> Optional[Tuple[Dict[str, Any], Dict[str, np.ndarray]]]:
+        """Return a small cached record (per-page blocks, heading memos) as (metadata, arrays), or None on a miss."""
+        entry_path = os.path.join(self.cache_dir, key + self.RECORD_SUFFIX)
+        try:
+            with open(entry_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        try:
+            record = _unpack_record(data)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache record {key}: {str(e)}")
+            self._remove(entry_path)
+            return None
+
+        try:
+            os.utime(entry_path, None)
+        except OSError:
+            pass
+
+        return record
+
+    def put_record(self, key: str, meta: Dict[str, Any], arrays: Optional[Dict[str, np.ndarray]] = None,
+                   evict: bool = True) -> None:
+        """Store JSON-serializable metadata and named NumPy arrays under key.
+
+        Callers writing many records in a row can pass evict=False and call
+        evict() once at the end.
+        """
+        data = _pack_record(meta, arrays)
+        self._write(key + self.RECORD_SUFFIX, data, key)
+        if evict:
+            self._evict()
+
+    def evict(self) -> None:
+        """Apply the size limit now."""
+        self._evict()
+
+    def _write(self, file_name: str, data: bytes, key: str) -> bool:
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, os.path.join(self.cache_dir, file_name))
+            except BaseException:
+                self._remove(tmp_path)
+                raise
+        except Exception as e:
+            logger.warning(f"Could not write cache entry {key}: {str(e)}")
+            return False
+        return True
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.ENTRY_SUFFIX)
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits max_bytes."""
+        entries = []
+        total_size = 0
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith((self.ENTRY_SUFFIX, self.RECORD_SUFFIX)):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue  # Removed by another process
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total_size += stat.st_size
+        except OSError as e:
+            logger.warning(f"Could not scan cache directory: {str(e)}")
+            return
+
+        if total_size <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_bytes:
+                break
+            self._remove(path)
+            total_size -= size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _extract_pages_worker(pdf_path: str, settings: Dict[str, Any], first_page: int, last_page: int,
+                          need_title: bool, deadline: Optional[float] = None) -> ExtractedPages:
+    """Process pool entry point: extract a page range with a private document handle.
+
+    deadline is a time.time() value. The worker stops at the first page
+    boundary past it, and skips the range entirely if it starts late, so
+    chunks never keep a pool process busy after the parent gave up on
+    them. The block budget is applied by the parent when merging.
+    """
+    parser = PDFParser()
+    for name, value in settings.items():
+        setattr(parser, name, value)
+    budget = None
+    if deadline is not None:
+        budget = ProcessingBudget(max(deadline - time.time(), 0.0))
+        if budget.exhausted(0):
+            last_page = first_page
+    with fitz.open(pdf_path) as doc:
+        return parser._extract_pages(doc, first_page, last_page, need_title, budget)
 
 class PDFParser:
     """PDF parsing class using PyMuPDF."""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[ParseCache] = None, max_pages: Optional[int] = 50,
+                 workers: int = 1, extraction_profile: str = "full", spill_bytes: Optional[int] = None,
+                 spill_dir: Optional[str] = None, merge_spans: bool = False, incremental: bool = False):
+        if extraction_profile not in EXTRACTION_PROFILES:
+            raise ValueError(f"Unknown extraction profile: {extraction_profile}")
+
         self.min_font_size = 6.0  # Ignore very small text
         self.max_font_size = 72.0  # Ignore very large text
+        self.extraction_profile = extraction_profile  # Key of EXTRACTION_PROFILES
+        self.merge_spans = merge_spans  # Coalesce compatible spans on the same line into one block
+        self.merge_size_tolerance = 0.5  # Max font size difference (pt) between merged spans
+        self.merge_space_ratio = 0.15  # Gap (x font size) above which merged spans are joined by a space
+        self.max_pages = max_pages  # Page budget per document, None for no limit
+        self.workers = workers  # Processes used to extract pages of one document
+        self.parallel_min_pages = 16  # Smaller documents are not worth splitting
+        self.min_bookmarks = 2  # Fewer bookmarks than this are not treated as an outline
+        self.spill_bytes = spill_bytes  # Blocks held in memory before spilling to disk, None to never spill
+        self.spill_dir = spill_dir  # Parent directory for spilled block files (default: system temp)
+        self.cache = cache
+        self.incremental = incremental  # Reuse cached blocks of unchanged pages (needs cache)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def close(self) -> None:
+        """Shut down the page extraction process pool, if one was started."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> 'PDFParser':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
     
-    def parse_pdf(self, pdf_path: str) -> Optional[DocumentData]:
-        """Parse PDF and extract structured text data."""
+    def parse_pdf(self, pdf_path: str, time_budget: Optional[float] = None,
+                  block_budget: Optional[int] = None) -> Optional[DocumentData]:
+        """Parse PDF and extract structured text data, using the cache if configured.
+
+        With a time budget (seconds) and/or block budget, parsing stops at the
+        first page boundary after the budget runs out and returns a partial
+        DocumentData with truncated=True and page_count set to the pages
+        covered. Partial results are not cached.
+        """
+        budget = ProcessingBudget.create(time_budget, block_budget)
+        if self.cache is None:
+            return self._parse_uncached(pdf_path, pdf_path, budget=budget)
+
+        try:
+            key = self.cache.make_key(pdf_path, self._cache_settings())
+        except OSError as e:
+            logger.error(f"Error reading PDF {pdf_path}: {str(e)}")
+            return None
+
+        return self._parse_cached(key, pdf_path, pdf_path, budget=budget)
+
+    def parse_bytes(self, data, name: str = "<memory>", time_budget: Optional[float] = None,
+                    block_budget: Optional[int] = None) -> Optional[DocumentData]:
+        """Parse a PDF held in memory.
+
+        Accepts any bytes-like object (bytes, bytearray, memoryview, mmap).
+        bytes and bytearray objects are handed to PyMuPDF without a copy and
+        must stay unchanged until this call returns; other buffers are
+        copied once (see _open_document). ``name`` is used as
+        the document's file_path. Budgets work as in parse_pdf.
+        """
+        budget = ProcessingBudget.create(time_budget, block_budget)
+        view = memoryview(data).cast('B')
+        try:
+            if self.cache is None:
+                return self._parse_uncached(name, data=view, budget=budget)
+            key = self.cache.make_buffer_key(view, self._cache_settings())
+            return self._parse_cached(key, name, data=view, budget=budget)
+        finally:
+            view.release()
+
+    def parse_stream(self, stream: BinaryIO, name: str = "<stream>", time_budget: Optional[float] = None,
+                     block_budget: Optional[int] = None) -> Optional[DocumentData]:
+        """Parse a PDF from a binary file object.
+
+        io.BytesIO contents are borrowed through getbuffer() without copying;
+        other streams are read into memory first.
+        """
+        if isinstance(stream, io.BytesIO):
+            buffer = stream.getbuffer()
+            try:
+                return self.parse_bytes(buffer, name, time_budget, block_budget)
+            finally:
+                buffer.release()
+        return self.parse_bytes(stream.read(), name, time_budget, block_budget)
+
+    def parse_mmap(self, pdf_path: str, time_budget: Optional[float] = None,
+                   block_budget: Optional[int] = None) -> Optional[DocumentData]:
+        """Parse a local PDF, hashing it for the cache key through a read-only memory map.
+
+        The map replaces buffered reads for the cache key only. PyMuPDF
+        then opens the file by path, so a cache miss never copies the file
+        into memory; without a cache this is the same as parse_pdf.
+        """
+        budget = ProcessingBudget.create(time_budget, block_budget)
+        if self.cache is None:
+            return self._parse_uncached(pdf_path, pdf_path, budget=budget)
+        try:
+            with open(pdf_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    key = self.cache.make_buffer_key(view, self._cache_settings())
+                finally:
+                    view.release()
+        except (OSError, ValueError) as e:
+            # mmap rejects empty files with ValueError
+            logger.error(f"Error mapping PDF {pdf_path}: {str(e)}")
+            return None
+        return self._parse_cached(key, pdf_path, pdf_path, budget=budget)
+
+    def read_bookmarks(self, pdf_path: str) -> Optional[BookmarkOutline]:
+        """Read the embedded table of contents, if it is present and plausible.
+
+        Only page 0 is extracted, for the title (when metadata has none), so
+        this is far cheaper than parse_pdf. Returns None when the document
+        has no bookmarks or they fail the checks in _plausible_bookmarks.
+        """
         try:
-            logger.info(f"Starting to parse PDF: {pdf_path}")
             with fitz.open(pdf_path) as doc:
-                if doc.page_count == 0:
-                    logger.warning(f"PDF has no pages: {pdf_path}")
+                entries = self._plausible_bookmarks(doc.get_toc(simple=True), doc.page_count)
+                if entries is None:
                     return None
+                return BookmarkOutline(
+                    title=self._extract_title(doc),
+                    entries=entries,
+                    page_count=doc.page_count,
+                    file_path=pdf_path
+                )
+        except Exception as e:
+            logger.error(f"Error reading bookmarks from {pdf_path}: {str(e)}")
+            return None
 
-                title = self._extract_title(doc)
-                logger.debug(f"Extracted title: {title}")
+    def read_title(self, pdf_path: str) -> Optional[str]:
+        """Read only the document title, as parse_pdf would find it.
 
-                text_blocks = []
-                font_sizes = []
-                font_counts = {}
+        Metadata is tried first; otherwise page 0 alone is extracted with the
+        parser's extraction profile, as in parse_pdf, for its largest span
+        (the "text" profile skips image payloads). No other page is touched
+        and nothing is cached. Returns None if the file cannot be opened.
+        """
+        try:
+            with fitz.open(pdf_path) as doc:
+                if self._metadata_title(doc) or doc.page_count == 0:
+                    return self._extract_title(doc)
+                first_page_dict = self._get_page_dict(doc[0])
+                return self._extract_title(doc, first_page_dict)
+        except Exception as e:
+            logger.error(f"Error reading title from {pdf_path}: {str(e)}")
+            return None
 
-                # Process pages with progress indication
-                max_pages = min(doc.page_count, 50)
-                logger.debug(f"Processing {max_pages} pages")
-                
-                for page_num in range(max_pages):
-                    try:
-                        page = doc[page_num]
-                        blocks = self._extract_page_blocks(page, page_num + 1)
-                        text_blocks.extend(blocks)
+    def _plausible_bookmarks(self, toc: List[List], page_count: int) -> Optional[List[Tuple[int, str, int]]]:
+        """Usable bookmark entries, or None if the ToC does not look like a real outline.
 
-                        for block in blocks:
-                            font_sizes.append(block.font_size)
-                            font_counts[block.font_name] = font_counts.get(block.font_name, 0) + 1
-                    except Exception as e:
-                        logger.warning(f"Error processing page {page_num + 1}: {str(e)}")
-                        continue
+        Entries without text or without a target page in the document are
+        dropped. The rest must number at least min_bookmarks, be at least
+        80% of the ToC, and start at depth 1 without skipping levels.
+        """
+        entries = [(depth, text.strip(), page) for depth, text, page in toc
+                   if text and text.strip() and 1 <= page <= page_count]
+        if len(entries) < self.min_bookmarks or len(entries) < 0.8 * len(toc):
+            return None
 
-                if not text_blocks:
-                    logger.warning(f"No text blocks found in PDF: {pdf_path}")
+        previous_depth = 0
+        for depth, _, _ in entries:
+            if depth > previous_depth + 1:
+                return None
+            previous_depth = depth
+        return entries
+
+    def _parse_cached(self, key: str, name: str, pdf_path: Optional[str] = None,
+                      data: Optional[memoryview] = None,
+                      budget: Optional[ProcessingBudget] = None) -> Optional[DocumentData]:
+        """Return the cached document for key, parsing and storing it on a miss."""
+        doc_data = self.cache.get(key, name)
+        if doc_data is not None:
+            logger.debug(f"Parse cache hit: {name}")
+            return doc_data
+
+        doc_data = self._parse_uncached(name, pdf_path, data, budget)
+        # Partial and spilled documents are not cached
+        if (doc_data is not None and not doc_data.truncated
+                and not isinstance(doc_data.text_blocks, SpilledBlockTable)):
+            self.cache.put(key, doc_data)
+        return doc_data
+
+    def _cache_settings(self) -> tuple:
+        """Parser settings that affect the parsed output."""
+        return self._page_settings() + (self.max_pages,)
+
+    def _page_settings(self) -> tuple:
+        """Parser settings that affect the blocks extracted from a single page."""
+        return (self.min_font_size, self.max_font_size, self.extraction_profile,
+                self.merge_spans, self.merge_size_tolerance, self.merge_space_ratio)
+
+    def _worker_settings(self) -> Dict[str, Any]:
+        """Attributes copied onto the parser inside page extraction workers."""
+        return {
+            'min_font_size': self.min_font_size,
+            'max_font_size': self.max_font_size,
+            'extraction_profile': self.extraction_profile,
+            'merge_spans': self.merge_spans,
+            'merge_size_tolerance': self.merge_size_tolerance,
+            'merge_space_ratio': self.merge_space_ratio,
+            'cache': self.cache if self.incremental else None,
+            'incremental': self.incremental,
+        }
+
+    def _page_limit(self, page_count: int) -> int:
+        """Number of pages to process under the page budget."""
+        if self.max_pages is None or page_count <= self.max_pages:
+            return page_count
+        logger.warning(f"Page budget of {self.max_pages} reached, skipping "
+                       f"{page_count - self.max_pages} of {page_count} pages")
+        return self.max_pages
+
+    def _open_document(self, pdf_path: Optional[str], data: Optional[memoryview]) -> fitz.Document:
+        """Open a document from memory if data is given, otherwise from pdf_path.
+
+        The pinned PyMuPDF only accepts bytes, bytearray or BytesIO streams,
+        so a view covering a whole bytes/bytearray object is opened through
+        that object, and any other buffer (mmap, partial views) is copied
+        into bytes once.
+        """
+        if data is not None:
+            source = data.obj
+            if not (isinstance(source, (bytes, bytearray)) and data.contiguous and data.nbytes == len(source)):
+                source = bytes(data)
+            return fitz.open(stream=source, filetype="pdf")
+        return fitz.open(pdf_path)
+
+    def _parse_uncached(self, name: str, pdf_path: Optional[str] = None,
+                        data: Optional[memoryview] = None,
+                        budget: Optional[ProcessingBudget] = None) -> Optional[DocumentData]:
+        """Parse PDF with PyMuPDF and extract structured text data.
+
+        The document is read from data when given, otherwise from pdf_path.
+        Parallel extraction needs pdf_path, since workers reopen the file.
+        """
+        try:
+            logger.info(f"Starting to parse PDF: {name}")
+            with self._open_document(pdf_path, data) as doc:
+                if doc.page_count == 0:
+                    logger.warning(f"PDF has no pages: {name}")
                     return None
 
-                avg_font_size = sum(font_sizes) / len(font_sizes) if font_sizes else 12.0
-                logger.debug(f"Found {len(text_blocks)} text blocks, avg font size: {avg_font_size:.2f}")
+                title = self._metadata_title(doc)
+                max_pages = self._page_limit(doc.page_count)
+                logger.debug(f"Processing {max_pages} pages")
 
-                return DocumentData(
-                    title=title,
-                    text_blocks=text_blocks,
-                    page_count=max_pages,
-                    avg_font_size=avg_font_size,
-                    common_fonts=font_counts,
-                    file_path=pdf_path
-                )
+                if pdf_path and self.workers > 1 and max_pages >= self.parallel_min_pages:
+                    pages = self._extract_pages_parallel(pdf_path, max_pages, not title, budget)
+                else:
+                    pages = self._extract_pages(doc, 0, max_pages, not title, budget)
+            text_blocks, font_stats, pages_covered = pages.text_blocks, pages.font_stats, pages.pages_covered
+
+            truncated = pages_covered < max_pages
+            if truncated:
+                logger.warning(f"Processing budget exhausted for {name}: "
+                               f"covered {pages_covered} of {max_pages} pages")
+
+            if not len(text_blocks) and not truncated:
+                logger.warning(f"No text blocks found in PDF: {name}")
+                return None
+
+            title = title or pages.title or "Untitled Document"
+            logger.debug(f"Extracted title: {title}")
+
+            avg_font_size = font_stats.mean()
+            logger.debug(f"Found {len(text_blocks)} text blocks, avg font size: {avg_font_size:.2f}")
+
+            return DocumentData(
+                title=title,
+                text_blocks=text_blocks,
+                page_count=pages_covered,
+                avg_font_size=avg_font_size,
+                common_fonts=font_stats.font_counts,
+                file_path=name,
+                truncated=truncated,
+                font_stats=font_stats,
+                page_keys=pages.page_keys
+            )
 
         except Exception as e:
-            logger.error(f"Error parsing PDF {pdf_path}: {str(e)}")
+            logger.error(f"Error parsing PDF {name}: {str(e)}")
             return None
 
-    
-    def _extract_title(self, doc: fitz.Document) -> str:
+    def iter_pages(self, pdf_path: str) -> Iterator[PageBatch]:
+        """Yield the text blocks of a PDF one page at a time.
+
+        Only the current page's blocks are held in memory, so consumers such
+        as HeadingDetector.iter_headings can start before the whole file is
+        read. The page budget applies as in parse_pdf.
+        """
+        try:
+            with fitz.open(pdf_path) as doc:
+                title = self._metadata_title(doc)
+                page_limit = self._page_limit(doc.page_count)
+
+                for page_num, page_title, blocks, _ in self._iter_page_blocks(doc, 0, page_limit, not title):
+                    if page_num == 1 and not title:
+                        title = page_title or "Untitled Document"
+                    yield PageBatch(
+                        page_num=page_num,
+                        text_blocks=TextBlockTable.from_blocks(blocks),
+                        title=title
+                    )
+        except Exception as e:
+            logger.error(f"Error streaming PDF {pdf_path}: {str(e)}")
+
+    def _extract_pages(self, doc: fitz.Document, first_page: int, last_page: int, need_title: bool,
+                       budget: Optional[ProcessingBudget] = None) -> ExtractedPages:
+        """Extract blocks from pages [first_page, last_page), plus the page-0 title if needed.
+
+        When the budget runs out, the remaining pages are skipped; a page
+        that would overrun the block budget contributes only the blocks that
+        fit and is not counted as covered. Blocks spill to disk past
+        spill_bytes.
+        """
+        title = ""
+        builder = BlockTableBuilder(self.spill_bytes, self.spill_dir)
+        block_count = 0
+        pages_covered = 0
+        page_keys = []
+
+        for page_num, page_title, blocks, page_key in self._iter_page_blocks(doc, first_page, last_page,
+                                                                              need_title):
+            title = title or page_title
+            if budget is not None and budget.block_budget is not None:
+                room = budget.block_budget - block_count
+                if len(blocks) > room:
+                    builder.add_blocks(blocks[:room])
+                    break
+
+            builder.add_blocks(blocks)
+            block_count += len(blocks)
+            pages_covered += 1
+            page_keys.append(page_key)
+            if budget is not None and page_num < last_page and budget.exhausted(block_count):
+                break
+
+        if self.incremental and self.cache is not None:
+            self.cache.evict()
+
+        return ExtractedPages(title, builder.finish(), builder.font_stats, pages_covered,
+                              page_keys if self.incremental and self.cache is not None else None)
+
+    def _iter_page_blocks(self, doc: fitz.Document, first_page: int, last_page: int,
+                          need_title: bool) -> Iterator[Tuple[int, str, List[TextBlock], Optional[str]]]:
+        """Yield (1-based page number, page-0 title, blocks, page key) for pages [first_page, last_page).
+
+        The page key is the page's content fingerprint when parsing
+        incrementally with a cache, else None. Pages whose fingerprint is
+        cached reuse the stored blocks instead of being re-extracted.
+        """
+        incremental = self.incremental and self.cache is not None
+        for page_num in range(first_page, last_page):
+            title = ""
+            page_key = None
+            try:
+                page = doc[page_num]
+                if incremental:
+                    page_key = self._page_fingerprint(doc, page)
+                    cached = self.cache.get_record(page_key)
+                    if cached is not None:
+                        meta, arrays = cached
+                        largest_text, table = meta['largest_text'], _table_from_arrays(arrays, meta['fonts'])
+                        if page_num == 0 and need_title:
+                            title = largest_text
+                        blocks = list(table)
+                        for block in blocks:
+                            block.page_num = page_num + 1
+                        yield page_num + 1, title, blocks, page_key
+                        continue
+
+                # Page 0 is only read once: its text dict feeds both title
+                # detection and block extraction
+                text_dict = self._get_page_dict(page)
+                if page_num == 0 and need_title:
+                    title = self._largest_span_text(text_dict)
+
+                blocks = self._extract_page_blocks(page, page_num + 1, text_dict)
+
+                if incremental:
+                    # Stored with the page's largest span, in case the page later moves to page 0
+                    largest_text = title or self._largest_span_text(text_dict)
+                    table = TextBlockTable.from_blocks(blocks)
+                    self.cache.put_record(page_key, {'largest_text': largest_text, 'fonts': table.fonts},
+                                          _table_arrays(table), evict=False)
+            except Exception as e:
+                logger.warning(f"Error processing page {page_num + 1}: {str(e)}")
+                blocks = []
+
+            yield page_num + 1, title, blocks, page_key
+
+    def _page_fingerprint(self, doc: fitz.Document, page: fitz.Page) -> str:
+        """Hash what a page's extracted text depends on, independent of its position.
+
+        Covers the page content stream, the form XObjects it draws, its
+        geometry and fonts (by name, not object number), and the parser
+        settings, so an edit elsewhere in the document leaves it unchanged.
+        """
+        digest = hashlib.sha256(b"page")
+        digest.update(repr((CACHE_FORMAT_VERSION, self._page_settings(), tuple(page.rect),
+                            page.rotation)).encode('utf-8'))
+        digest.update(page.read_contents())
+        for font in page.get_fonts():
+            digest.update(repr(font[1:]).encode('utf-8'))
+        for xobject in page.get_xobjects():
+            digest.update(doc.xref_stream(xobject[0]) or b"")
+        return digest.hexdigest()
+
+    def _extract_pages_parallel(self, pdf_path: str, page_count: int, need_title: bool,
+                                budget: Optional[ProcessingBudget] = None) -> ExtractedPages:
+        """Split the page range across worker processes and merge results in page order.
+
+        Under a time budget, workers stop at the first page boundary past
+        the deadline and chunks that have not started are cancelled. The
+        leading pages covered without a gap are kept.
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        chunk_size = -(-page_count // self.workers)
+        settings = self._worker_settings()
+        remaining = budget.remaining_time() if budget else None
+        deadline = time.time() + remaining if remaining is not None else None
+        futures = [
+            self._executor.submit(_extract_pages_worker, pdf_path, settings, first,
+                                  min(first + chunk_size, page_count), need_title and first == 0, deadline)
+            for first in range(0, page_count, chunk_size)
+        ]
+        done, _ = wait(futures, timeout=remaining)
+        if len(done) < len(futures):
+            # Running chunks finish their current page and return what they covered
+            for future in futures:
+                future.cancel()
+            done, _ = wait([future for future in futures if not future.cancelled()])
+
+        title = ""
+        builder = BlockTableBuilder(self.spill_bytes, self.spill_dir)
+        block_count = 0
+        pages_covered = 0
+        page_keys = []
+        for index, (first, future) in enumerate(zip(range(0, page_count, chunk_size), futures)):
+            if future not in done:
+                break
+            chunk = future.result()
+            done.discard(future)
+            futures[index] = None  # Release the result once the builder holds it
+            title = title if index else chunk.title
+            table = chunk.text_blocks
+            if budget is not None and budget.block_budget is not None:
+                room = budget.block_budget - block_count
+                if len(table) > room:
+                    # Keep the blocks that fit; the page they stop in is not covered
+                    pages_covered = int(table.page_num[room]) - 1
+                    builder.add_table(table[:room])
+                    break
+            builder.add_table(table)
+            block_count += len(table)
+            pages_covered = first + chunk.pages_covered
+            page_keys.extend(chunk.page_keys or [])
+            if pages_covered < min(first + chunk_size, page_count):
+                break  # The chunk stopped at the deadline; later chunks would leave a gap
+
+        return ExtractedPages(title, builder.finish(), builder.font_stats, pages_covered,
+                              page_keys[:pages_covered] if self.incremental and self.cache is not None else None)
+
+    def _extract_title(self, doc: fitz.Document, first_page_dict: Optional[Dict[str, Any]] = None) -> str:
         """Extract document title from metadata or first page."""
         # Try metadata first
-        metadata = doc.metadata
-        if metadata.get('title'):
-            return metadata['title'].strip()
+        title = self._metadata_title(doc)
+        if title:
+            return title
         
         # Try first page - look for largest text or first line
         if doc.page_count > 0:
-            page = doc[0]
-            blocks = page.get_text("dict")
-            
-            largest_text = ""
-            largest_size = 0
-            
-            for block in blocks.get("blocks", []):
-                if "lines" in block:
-                    for line in block["lines"]:
-                        for span in line.get("spans", []):
-                            text = span.get("text", "").strip()
-                            size = span.get("size", 0)
-                            
-                            if text and size > largest_size and len(text) > 3:
-                                largest_text = text
-                                largest_size = size
-            
+            if first_page_dict is None:
+                first_page_dict = self._get_page_dict(doc[0])
+            largest_text = self._largest_span_text(first_page_dict)
             if largest_text:
                 return largest_text
         
         return "Untitled Document"
+
+    def _metadata_title(self, doc: fitz.Document) -> str:
+        """Title from document metadata, or an empty string."""
+        metadata = doc.metadata or {}
+        return (metadata.get('title') or '').strip()
+
+    def _largest_span_text(self, text_dict: Dict[str, Any]) -> str:
+        """Text of the largest-font span on a page, or an empty string."""
+        largest_text = ""
+        largest_size = 0
+        
+        for block in text_dict.get("blocks", []):
+            if "lines" in block:
+                for line in block["lines"]:
+                    for span in line.get("spans", []):
+                        text = span.get("text", "").strip()
+                        size = span.get("size", 0)
+                        
+                        if text and size > largest_size and len(text) > 3:
+                            largest_text = text
+                            largest_size = size
+        
+        return largest_text
+
+    def _get_page_dict(self, page: fitz.Page, flags: Optional[int] = None) -> Dict[str, Any]:
+        """Run text extraction for a page once, through a single TextPage."""
+        if flags is None:
+            flags = EXTRACTION_PROFILES[self.extraction_profile]
+        textpage = page.get_textpage(flags=flags)
+        return page.get_text("dict", textpage=textpage)
     
-    def _extract_page_blocks(self, page: fitz.Page, page_num: int) -> List[TextBlock]:
-        """Extract text blocks from a single page."""
+    def _extract_page_blocks(self, page: fitz.Page, page_num: int,
+                             text_dict: Optional[Dict[str, Any]] = None) -> List[TextBlock]:
+        """Extract text blocks from a single page, reusing text_dict if already extracted."""
         blocks = []
         
         try:
-            text_dict = page.get_text("dict")
+            if text_dict is None:
+                text_dict = self._get_page_dict(page)
             
             for block in text_dict.get("blocks", []):
                 if "lines" not in block:
                     continue
                 
                 for line in block["lines"]:
-                    for span in line.get("spans", []):
+                    spans = line.get("spans", [])
+                    if self.merge_spans:
+                        spans = self._merge_line_spans(spans)
+
+                    for span in spans:
                         text = span.get("text", "").strip()
                         
                         if not text or len(text) < 2:
@@ -204,8 +967,78 @@ class PDFParser:
         
         return processed_blocks
 
+    def _merge_line_spans(self, spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Coalesce consecutive spans of one line into span-like dicts.
+
+        Neighbouring spans merge when their font sizes are within
+        merge_size_tolerance and their bold/italic flags match. A span that
+        is only a section number (NUMBERING_PREFIX) merges with the span
+        after it whatever its style, taking that span's font. Spans outside
+        the font size filter are never merged. Merged spans are joined with
+        a space when either side has whitespace at the join or there is a
+        visible gap between them.
+        """
+        if len(spans) < 2:
+            return spans
+
+        merged: List[Dict[str, Any]] = []
+        current = None
+
+        for span in spans:
+            raw_text = span.get("text", "")
+            text = raw_text.strip()
+            font_size = span.get("size", 12.0)
+            if not text:
+                if current is not None and raw_text:
+                    current["space"] = True
+                continue
+            if font_size < self.min_font_size or font_size > self.max_font_size:
+                if current is not None:
+                    merged.append(current)
+                    current = None
+                merged.append(span)
+                continue
+
+            if current is not None:
+                numbering = NUMBERING_PREFIX.match(current["text"]) is not None
+                compatible = (abs(font_size - current["size"]) <= self.merge_size_tolerance and
+                              (span.get("flags", 0) & MERGE_FLAG_MASK) == (current["flags"] & MERGE_FLAG_MASK))
+                if numbering or compatible:
+                    bbox = span.get("bbox", (0, 0, 0, 0))
+                    gap = bbox[0] - current["bbox"][2]
+                    spaced = (numbering or current["space"] or raw_text[0].isspace() or
+                              gap > self.merge_space_ratio * font_size)
+                    separator = " " if spaced else ""
+                    current = {
+                        "text": current["text"] + separator + text,
+                        "size": max(current["size"], font_size),
+                        "flags": span.get("flags", 0) if numbering else current["flags"],
+                        "font": span.get("font", "unknown") if numbering else current["font"],
+                        "bbox": (min(current["bbox"][0], bbox[0]), min(current["bbox"][1], bbox[1]),
+                                 max(current["bbox"][2], bbox[2]), max(current["bbox"][3], bbox[3])),
+                        "space": raw_text[-1].isspace(),
+                    }
+                    continue
+                merged.append(current)
+
+            current = {
+                "text": text,
+                "size": font_size,
+                "flags": span.get("flags", 0),
+                "font": span.get("font", "unknown"),
+                "bbox": tuple(span.get("bbox", (0, 0, 0, 0))),
+                "space": raw_text[-1].isspace(),  # Trailing whitespace separates the next span
+            }
+
+        if current is not None:
+            merged.append(current)
+        return merged
+
     def _combine_numbered_sections(self, blocks: List[TextBlock]) -> List[TextBlock]:
-        """Combine standalone numbered sections like '1.' with their following text."""
+        """Combine standalone numbered sections like '1.' with their following text.
+
+        With merge_spans, any NUMBERING_PREFIX counts, not just '1.'-'4.'.
+        """
         if not blocks:
             return blocks
             
@@ -216,7 +1049,9 @@ class PDFParser:
             current_block = blocks[i]
             
             # Check if this is a standalone numbered section (1., 2., 3., 4.)
-            if (current_block.text.strip() in ['1.', '2.', '3.', '4.'] and 
+            number = current_block.text.strip()
+            if ((number in ['1.', '2.', '3.', '4.'] or
+                 (self.merge_spans and NUMBERING_PREFIX.match(number))) and
                 i + 1 < len(blocks)):
                 
                 # Look for the next text block that could be the heading title
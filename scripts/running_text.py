@@ -0,0 +1,124 @@
+"""
+Running Text Module
+Finds running headers and footers repeated across pages and removes them before heading detection
+"""
+
+import re
+import hashlib
+import logging
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+from pdf_parser import DocumentData, SpilledBlockTable
+
+logger = logging.getLogger(__name__)
+
+_DIGITS = re.compile(r'\d+')
+_LETTERS = re.compile(r'[^\W\d_]')
+
+class RunningTextFilter:
+    """Pre-pass removing text repeated at a stable position in the page margins.
+
+    Margin bands are the top and bottom margin_fraction of the document's
+    text extent (no page sizes needed). Blocks in a band are hashed on
+    (band, y bucket, normalized text), where normalization
+    lowercases and collapses whitespace. Digit runs are folded too in texts
+    with few letters, so "Page 3 of 40" and "Page 4 of 40" share a key while
+    "Section 3 Results" and "Section 4 Results" do not. A key seen on at
+    least min_pages pages and min_page_fraction of the document marks its
+    blocks as running text.
+    """
+
+    def __init__(self):
+        self.margin_fraction = 0.12  # Band height, as a share of the text extent
+        self.y_tolerance = 3.0  # Position drift (pt) between copies on different pages
+        self.min_pages = 3  # Pages a text must repeat on
+        self.min_page_fraction = 0.5  # Share of the document's pages it must repeat on
+        self.fold_digits_max_letters = 12  # Page-number style texts whose digits are ignored
+
+    def find(self, doc_data: DocumentData) -> np.ndarray:
+        """Boolean mask over doc_data.text_blocks, True for running headers and footers."""
+        table = doc_data.text_blocks
+        running = np.zeros(len(table), dtype=bool)
+        required = max(self.min_pages, int(np.ceil(self.min_page_fraction * doc_data.page_count)))
+        if len(table) == 0 or doc_data.page_count < required:
+            return running
+
+        top, bottom = float(table.y0.min()), float(table.y1.max())
+        band = self.margin_fraction * (bottom - top)
+        in_top = table.y0 < top + band
+        in_bottom = table.y1 > bottom - band
+
+        # Margin-band index: (band, y bucket, normalized text) -> pages and block indices.
+        # Top blocks are placed by their top edge, bottom blocks by their bottom edge.
+        indices = np.flatnonzero(in_top | in_bottom)
+        bands = np.where(in_top[indices], 0, 1).tolist()
+        buckets = np.rint(np.where(in_top, table.y0, table.y1)[indices] / self.y_tolerance).astype(np.int64).tolist()
+        page_nums = table.page_num[indices].tolist()
+
+        pages: Dict[Tuple[int, int, str], Set[int]] = {}
+        members: Dict[Tuple[int, int, str], List[int]] = {}
+        for index, band_id, bucket, page_num in zip(indices.tolist(), bands, buckets, page_nums):
+            key = (band_id, bucket, self._normalize(table.text(index)))
+            pages.setdefault(key, set()).add(page_num)
+            members.setdefault(key, []).append(index)
+
+        for (band_id, bucket, digest), indices in members.items():
+            # Copies may straddle a bucket boundary
+            seen = set()
+            for neighbour in (bucket - 1, bucket, bucket + 1):
+                seen |= pages.get((band_id, neighbour, digest), set())
+            if len(seen) >= required:
+                running[indices] = True
+        return running
+
+    def apply(self, doc_data: DocumentData) -> DocumentData:
+        """Copy of doc_data without its running headers and footers.
+
+        Font statistics are recomputed over the remaining blocks. Page
+        fingerprints, if any, are combined with the positions removed from
+        each page, so per-page heading memoization stays valid. A spilled
+        table stays spilled: the remaining blocks are copied to new files.
+        """
+        running = self.find(doc_data)
+        if not running.any():
+            return doc_data
+
+        table = doc_data.text_blocks
+        keep = np.flatnonzero(~running)
+        if isinstance(table, SpilledBlockTable):
+            text_blocks = table.take_spilled(keep)
+        else:
+            text_blocks = table.take(keep)
+        page_keys = None
+        if doc_data.page_keys is not None:
+            page_keys = []
+            for page_num, page_key in enumerate(doc_data.page_keys, start=1):
+                start, end = table.page_bounds(page_num)
+                removed = (np.flatnonzero(running[start:end])).tolist()
+                if removed:
+                    page_key = hashlib.sha256(repr((page_key, removed)).encode('utf-8')).hexdigest()
+                page_keys.append(page_key)
+
+        filtered = DocumentData(
+            title=doc_data.title,
+            text_blocks=text_blocks,
+            page_count=doc_data.page_count,
+            avg_font_size=0.0,
+            common_fonts={},
+            file_path=doc_data.file_path,
+            truncated=doc_data.truncated,
+            page_keys=page_keys,
+            annotations=doc_data.annotations
+        )
+        filtered.avg_font_size = filtered.font_stats.mean()
+        filtered.common_fonts = filtered.font_stats.font_counts
+        logger.info(f"Suppressed {int(running.sum())} running header/footer blocks of {len(table)}")
+        return filtered
+
+    def _normalize(self, text: str) -> str:
+        normalized = ' '.join(text.lower().split())
+        if _DIGITS.search(normalized) and len(_LETTERS.findall(normalized)) <= self.fold_digits_max_letters:
+            normalized = _DIGITS.sub('#', normalized)
+        return normalized
@@ -0,0 +1,112 @@
+"""
+PDF Parser Tests
+In-memory entry points against the installed PyMuPDF (requirements.txt pins the supported release)
+and the on-disk parse cache format
+"""
+
+import io
+import os
+import pickle
+import tempfile
+import unittest
+import zlib
+
+import fitz
+
+from pdf_parser import ParseCache, PDFParser
+
+INPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'input')
+SAMPLE_PDF = os.path.join(INPUT_DIR, 'file03.pdf')
+
+class _ReadOnlyStream(io.RawIOBase):
+    """A binary stream without getbuffer(), like a socket or pipe."""
+
+    def __init__(self, data: bytes):
+        self._inner = io.BytesIO(data)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        return self._inner.readinto(buffer)
+
+class InMemoryEntryPointTest(unittest.TestCase):
+    """parse_bytes, parse_stream and parse_mmap must match parse_pdf on the same file."""
+
+    @classmethod
+    def setUpClass(cls):
+        with open(SAMPLE_PDF, 'rb') as f:
+            cls.data = f.read()
+        cls.expected = PDFParser().parse_pdf(SAMPLE_PDF)
+
+    def assertSameDocument(self, doc_data):
+        self.assertIsNotNone(doc_data, f"PyMuPDF {fitz.VersionBind} failed to open the document")
+        self.assertEqual(doc_data.title, self.expected.title)
+        self.assertEqual(doc_data.page_count, self.expected.page_count)
+        self.assertEqual(doc_data.text_blocks, self.expected.text_blocks)
+
+    def test_parse_pdf(self):
+        self.assertIsNotNone(self.expected)
+        self.assertGreater(len(self.expected.text_blocks), 0)
+
+    def test_parse_bytes(self):
+        self.assertSameDocument(PDFParser().parse_bytes(self.data))
+
+    def test_parse_bytearray(self):
+        self.assertSameDocument(PDFParser().parse_bytes(bytearray(self.data)))
+
+    def test_parse_memoryview_slice(self):
+        padded = b'\0' * 16 + self.data + b'\0' * 16
+        self.assertSameDocument(PDFParser().parse_bytes(memoryview(padded)[16:-16]))
+
+    def test_parse_stream_bytesio(self):
+        self.assertSameDocument(PDFParser().parse_stream(io.BytesIO(self.data)))
+
+    def test_parse_stream_without_getbuffer(self):
+        self.assertSameDocument(PDFParser().parse_stream(_ReadOnlyStream(self.data)))
+
+    def test_parse_mmap(self):
+        self.assertSameDocument(PDFParser().parse_mmap(SAMPLE_PDF))
+
+    def test_parse_mmap_cached(self):
+        with tempfile.TemporaryDirectory() as directory:
+            parser = PDFParser(cache=ParseCache(directory))
+            self.assertSameDocument(parser.parse_mmap(SAMPLE_PDF))
+            self.assertSameDocument(parser.parse_mmap(SAMPLE_PDF))
+
+class ParseCacheTest(unittest.TestCase):
+    """Cache entries round-trip exactly and are never read as pickles."""
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(self._directory.name)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_document_round_trip(self):
+        parser = PDFParser(cache=self.cache)
+        parsed = parser.parse_pdf(SAMPLE_PDF)
+        cached = parser.parse_pdf(SAMPLE_PDF)
+        self.assertEqual(cached, parsed)
+        self.assertEqual(list(cached.common_fonts.items()), list(parsed.common_fonts.items()))
+        self.assertEqual(cached.font_stats.size_buckets, parsed.font_stats.size_buckets)
+        self.assertEqual(cached.font_stats.total, parsed.font_stats.total)
+
+    def test_incremental_records_round_trip(self):
+        parsed = PDFParser(cache=self.cache, incremental=True).parse_pdf(SAMPLE_PDF)
+        fresh_cache = ParseCache(self._directory.name)
+        for name in os.listdir(self._directory.name):
+            if name.endswith(ParseCache.ENTRY_SUFFIX):
+                os.remove(os.path.join(self._directory.name, name))  # Force the per-page records path
+        self.assertEqual(PDFParser(cache=fresh_cache, incremental=True).parse_pdf(SAMPLE_PDF), parsed)
+
+    def test_pickled_record_is_discarded(self):
+        path = os.path.join(self._directory.name, "key" + ParseCache.RECORD_SUFFIX)
+        with open(path, 'wb') as f:
+            f.write(zlib.compress(pickle.dumps((5, {"largest_text": ""}))))
+        self.assertIsNone(self.cache.get_record("key"))
+        self.assertFalse(os.path.exists(path))
+
+if __name__ == '__main__':
+    unittest.main()
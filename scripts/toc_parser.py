@@ -0,0 +1,128 @@
+"""
+Printed Table of Contents Module
+Finds dotted-leader table of contents pages and parses their entries
+"""
+
+import re
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+import fitz  # PyMuPDF
+
+from pdf_parser import DocumentData, EXTRACTION_PROFILES
+
+logger = logging.getLogger(__name__)
+
+# Dot leaders between an entry title and its page number: "....", ". . . .", "……"
+LEADER = re.compile(r'(?:\.\s?){4,}|…{2,}')
+
+# "2.1 Intended Audience ........ 6", "Revision History ..... 3"
+TOC_ENTRY = re.compile(
+    r'^(?:(?P<number>\d+(?:\.\d+)*\.?)\s+)?(?P<title>\S.*?)\s*(?:(?:\.\s?){4,}|…{2,})\s*(?P<page>\d{1,4})$'
+)
+
+@dataclass
+class TocEntry:
+    """One line of a printed table of contents."""
+    number: str  # Section number as printed ("2.1", "1."), empty if unnumbered
+    title: str
+    depth: int  # 1 for unnumbered and "1." entries, 2 for "2.1", ...
+    printed_page: int  # Page number as printed in the ToC
+    toc_page: int  # 1-based page the entry is listed on
+    page: int = 0  # 1-based physical page, set by HeadingDetector.verify_toc_entries
+    verified: bool = False  # A matching heading was found on the target page
+
+    @property
+    def text(self) -> str:
+        return f"{self.number} {self.title}" if self.number else self.title
+
+class PrintedTocParser:
+    """Detects table of contents pages and parses their dotted-leader entries."""
+
+    def __init__(self):
+        self.scan_pages = 10  # ToC pages are looked for among the first pages only
+        self.min_leader_blocks = 3  # Blocks with dot leaders needed to call a page a ToC
+        self.min_entries = 3  # Entries needed to use a ToC
+        self.row_tolerance = 3.0  # Max vertical distance (pt) between span centres on one row
+
+    def find_entries(self, doc_data: DocumentData, pdf_path: str, extraction_profile: str = "full") -> List[TocEntry]:
+        """Entries of the document's printed ToC, or an empty list if it has none.
+
+        Candidate pages are found from the already parsed blocks; only those
+        pages are read again from the PDF.
+        """
+        toc_pages = self.find_toc_pages(doc_data)
+        if not toc_pages:
+            return []
+
+        entries = []
+        try:
+            with fitz.open(pdf_path) as doc:
+                for page_num in toc_pages:
+                    text_dict = doc[page_num - 1].get_text("dict", flags=EXTRACTION_PROFILES[extraction_profile])
+                    entries.extend(self.parse_page(text_dict, page_num))
+        except Exception as e:
+            logger.error(f"Error reading table of contents from {pdf_path}: {str(e)}")
+            return []
+
+        if len(entries) < self.min_entries:
+            return []
+        logger.debug(f"Found {len(entries)} ToC entries on pages {toc_pages}")
+        return entries
+
+    def find_toc_pages(self, doc_data: DocumentData) -> List[int]:
+        """Pages among the first scan_pages whose blocks contain enough dot leaders."""
+        table = doc_data.text_blocks
+        start, end = table.page_range_bounds(1, self.scan_pages)
+        leader_counts: Dict[int, int] = {}
+        for index, page_num in enumerate(table.page_num[start:end].tolist(), start):
+            if LEADER.search(table.text(index)):
+                leader_counts[page_num] = leader_counts.get(page_num, 0) + 1
+        return [page for page, count in leader_counts.items() if count >= self.min_leader_blocks]
+
+    def parse_page(self, text_dict: Dict[str, Any], page_num: int) -> List[TocEntry]:
+        """Parse the ToC entries of one page from its PyMuPDF text dict.
+
+        Spans are regrouped into visual rows first: titles, leaders and page
+        numbers are often separate blocks, and single-digit page numbers
+        never make it into the parsed text blocks.
+        """
+        entries = []
+        for row in self._rows(text_dict):
+            match = TOC_ENTRY.match(row)
+            if not match:
+                continue
+            number = match.group('number') or ""
+            entries.append(TocEntry(
+                number=number,
+                title=match.group('title').strip(),
+                depth=len(number.rstrip('.').split('.')) if number else 1,
+                printed_page=int(match.group('page')),
+                toc_page=page_num
+            ))
+        return entries
+
+    def _rows(self, text_dict: Dict[str, Any]) -> List[str]:
+        """Text of each visual row, spans ordered left to right."""
+        spans = []
+        for block in text_dict.get("blocks", []):
+            for line in block.get("lines", []):
+                for span in line.get("spans", []):
+                    text = span.get("text", "").strip()
+                    if text:
+                        x0, y0, _, y1 = span.get("bbox", (0, 0, 0, 0))
+                        spans.append(((y0 + y1) / 2, x0, text))
+        spans.sort()
+
+        rows = []
+        current: List[tuple] = []
+        for span in spans:
+            if current and span[0] - current[0][0] > self.row_tolerance:
+                rows.append(current)
+                current = []
+            current.append(span)
+        if current:
+            rows.append(current)
+
+        return [" ".join(text for _, _, text in sorted(row, key=lambda s: s[1])) for row in rows]